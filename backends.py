@@ -0,0 +1,193 @@
+import numpy as np
+from ortools.sat import cp_model_pb2
+from telemetry import TELEMETRY, parse_cpsat_log
+
+"""
+Solver backends the squad formulation can be emitted to. Every backend exposes the same small modelling
+interface (boolean vars, ranged linear constraints, implications, a maximised objective, hints) so
+engine.build_model doesn't care which solver ends up with the model. `rows` keeps handles to the
+constraints callers need to find again (e.g. the cost row of each GW).
+
+Statuses are reported with the CP-SAT codes (cp_model_pb2.OPTIMAL, ...) whatever the backend. The solver
+modules themselves are only imported once a backend is made, they take longer to import than most runs
+that hit the result cache take.
+"""
+
+# pywraplp solver ids, "glop" solves the LP relaxation only (a fast upper bound, no squads)
+MIP_SOLVERS = {"scip": "SCIP", "cbc": "CBC", "glop": "GLOP"}
+BACKENDS = ["cp-sat"] + list(MIP_SOLVERS)
+
+
+def make_backend(name):
+    if name == "cp-sat":
+        return CpSatBackend()
+    if name in MIP_SOLVERS:
+        return MipBackend(name)
+    raise ValueError(f"Unknown backend '{name}', choose from: {', '.join(BACKENDS)}")
+
+
+class CpSatBackend:
+    name = "cp-sat"
+    relaxation = False
+    streams = True
+
+    def __init__(self):
+        from ortools.sat.python import cp_model
+
+        self.cp_model = cp_model
+        self.model = cp_model.CpModel()
+        self.solver = cp_model.CpSolver()
+        self.rows = {}
+        self._log = []
+
+    def new_bool(self, name):
+        return self.model.new_bool_var(name)
+
+    def add_linear(self, vars, coeffs, lo, hi):
+        return self.model.add_linear_constraint(self.cp_model.LinearExpr.weighted_sum(vars, coeffs), lo, hi)
+
+    def add_sum(self, vars, lo, hi):
+        self.model.add_linear_constraint(self.cp_model.LinearExpr.sum(vars), lo, hi)
+
+    def add_implication(self, a, b):
+        self.model.add_implication(a, b)
+
+    def maximize(self, vars, coeffs):
+        self.model.maximize(self.cp_model.LinearExpr.weighted_sum(vars, coeffs))
+
+    def add_hint(self, var, value):
+        self.model.add_hint(var, value)
+
+    def solve(self, num_workers=0, time_limit=None, callback=None):
+        self.solver.parameters.num_workers = num_workers
+        if time_limit is not None:
+            self.solver.parameters.max_time_in_seconds = time_limit
+        if TELEMETRY.enabled:
+            # the search log is where presolve reductions and bound progress are reported
+            self.solver.parameters.log_search_progress = True
+            self.solver.parameters.log_to_stdout = False
+            self.solver.log_callback = self._log.append
+        return self.solver.solve(self.model, callback)
+
+    def stats(self):
+        response = self.solver.response_proto
+        stats = {
+            "variables": len(self.model.proto.variables),
+            "constraints": len(self.model.proto.constraints),
+            "wall_time": response.wall_time,
+            "conflicts": response.num_conflicts,
+            "branches": response.num_branches,
+            "booleans": response.num_booleans,
+            "deterministic_time": response.deterministic_time,
+            "lp_iterations": response.num_lp_iterations,
+        }
+        stats.update(parse_cpsat_log(self._log))
+        return stats
+
+    def values(self, vars):
+        # one copy of the solution out of the response, then a single gather
+        solution = np.asarray(self.solver.response_proto.solution)
+        return solution[np.fromiter((v.index for v in vars), dtype=np.int64, count=len(vars))]
+
+    @property
+    def objective_value(self):
+        return self.solver.objective_value
+
+    @property
+    def best_bound(self):
+        return self.solver.best_objective_bound
+
+    @property
+    def conflicts(self):
+        return self.solver.num_conflicts
+
+    @property
+    def branches(self):
+        return self.solver.num_branches
+
+
+class MipBackend:
+    """
+    SCIP / CBC through pywraplp, or GLOP on the LP relaxation (variables relaxed to [0, 1]).
+    """
+
+    streams = False
+
+    def __init__(self, name):
+        from ortools.linear_solver import pywraplp
+
+        self.status = {
+            pywraplp.Solver.OPTIMAL: cp_model_pb2.OPTIMAL,
+            pywraplp.Solver.FEASIBLE: cp_model_pb2.FEASIBLE,
+            pywraplp.Solver.INFEASIBLE: cp_model_pb2.INFEASIBLE,
+        }
+        self.name = name
+        self.relaxation = name == "glop"
+        self.solver = pywraplp.Solver.CreateSolver(MIP_SOLVERS[name])
+        if not self.solver:
+            raise RuntimeError(f"Could not create solver {MIP_SOLVERS[name]}")
+        self.rows = {}
+        self._hint_vars, self._hint_values = [], []
+
+    def new_bool(self, name):
+        return self.solver.NumVar(0, 1, name) if self.relaxation else self.solver.BoolVar(name)
+
+    def add_linear(self, vars, coeffs, lo, hi):
+        ct = self.solver.Constraint(lo, hi)
+        for v, c in zip(vars, coeffs):
+            ct.SetCoefficient(v, c)
+        return ct
+
+    def add_sum(self, vars, lo, hi):
+        self.add_linear(vars, [1] * len(vars), lo, hi)
+
+    def add_implication(self, a, b):
+        self.add_linear([a, b], [1, -1], -self.solver.infinity(), 0)
+
+    def maximize(self, vars, coeffs):
+        objective = self.solver.Objective()
+        for v, c in zip(vars, coeffs):
+            objective.SetCoefficient(v, c)
+        objective.SetMaximization()
+
+    def add_hint(self, var, value):
+        self._hint_vars.append(var)
+        self._hint_values.append(float(value))
+
+    def solve(self, num_workers=0, time_limit=None, callback=None):
+        # callback is CP-SAT only, MIP backends only report the final solution
+        if self._hint_vars and not self.relaxation:
+            self.solver.SetHint(self._hint_vars, self._hint_values)
+        if num_workers:
+            self.solver.SetNumThreads(num_workers)
+        if time_limit is not None:
+            self.solver.SetTimeLimit(int(time_limit * 1000))
+        return self.status.get(self.solver.Solve(), cp_model_pb2.UNKNOWN)
+
+    def stats(self):
+        return {
+            "variables": self.solver.NumVariables(),
+            "constraints": self.solver.NumConstraints(),
+            "wall_time": self.solver.wall_time() / 1000,
+            "branches": self.branches,
+            "lp_iterations": self.solver.iterations(),
+        }
+
+    def values(self, vars):
+        return np.rint([v.solution_value() for v in vars]).astype(np.int64)
+
+    @property
+    def objective_value(self):
+        return self.solver.Objective().Value()
+
+    @property
+    def best_bound(self):
+        return self.solver.Objective().BestBound()
+
+    @property
+    def conflicts(self):
+        return 0
+
+    @property
+    def branches(self):
+        return 0 if self.relaxation else self.solver.nodes()
@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dataloader import Dataloader
+from resident import ResidentModel
+
+"""
+Optimise many managed squads in one process. Reads one squad per line (JSON):
+
+    {"id": "team-a", "squad": [15 player ids], "bank": 5, "locked": [430], "banned": [16]}
+
+The squad plus the bank sets the budget (prices in tenths of a million, like players_raw.csv) and warm starts
+the solve. All squads share one loaded player table and set of compiled models, and are solved on a thread
+pool sized to the cores (CP-SAT releases the GIL). Each result is written to <output dir>/<id>.json.
+"""
+
+
+def squad_request(squad, players):
+    unknown = [pid for pid in squad.get("squad", []) if pid not in players]
+    if unknown:
+        raise ValueError(f"Players {unknown} are unknown")
+
+    value = sum(players[pid].price for pid in squad.get("squad", []))
+    request = {key: squad[key] for key in ["locked", "banned", "gws", "time_limit"] if key in squad}
+    if "squad" in squad:
+        request["budget"] = value + squad.get("bank", 0)
+        request["hint"] = squad["squad"]
+    return request
+
+
+def solve_squad(resident, squad, players, output_dir):
+    try:
+        result = resident.solve(squad_request(squad, players), num_workers=1)
+    except (ValueError, TypeError) as e:
+        result = {"error": str(e)}
+
+    result["id"] = squad["id"]
+    # ids may be ints (manager ids)
+    with open(os.path.join(output_dir, str(squad["id"]) + ".json"), "w") as f:
+        json.dump(result, f)
+    return result
+
+
+def run_batch(squads_path, output_dir, workers=None):
+    with open(squads_path) as f:
+        squads = [json.loads(line) for line in f if line.strip()]
+    for i, squad in enumerate(squads):
+        squad.setdefault("id", str(i))
+
+    os.makedirs(output_dir, exist_ok=True)
+    resident = ResidentModel()
+    players = Dataloader().players
+    workers = workers or os.cpu_count() or 1
+
+    print(f"Optimising {len(squads)} squads on {workers} threads")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda squad: solve_squad(resident, squad, players, output_dir), squads))
+    elapsed = time.perf_counter() - start
+
+    failed = [str(r["id"]) for r in results if "error" in r]
+    print(f"{len(squads) - len(failed)} squads optimised in {elapsed:.2f} s ({len(squads) / elapsed * 60:.0f} squads per minute)")
+    if failed:
+        print(f"{len(failed)} failed: {', '.join(failed)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Optimise a file of squads (one JSON object per line)")
+    parser.add_argument("squads", help="JSON lines file of squads")
+    parser.add_argument("output_dir", help="directory the per-squad results are written to")
+    parser.add_argument("--workers", type=int, help="solver threads (default: one per core)")
+    args = parser.parse_args()
+
+    run_batch(args.squads, args.output_dir, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+from ortools.sat.python import cp_model
+from backends import BACKENDS
+from dataloader import Dataloader, GWS, SEASON
+from engine import GK, DEF, MID, ATT, build_index, build_model, presolve
+from player import store_rows
+
+"""
+Benchmarks for the engine. Run with `python benchmark.py <name>`, e.g. `python benchmark.py build`
+"""
+
+BUILD_POOL_SIZES = [740, 2000, 5000]
+BACKEND_TIME_LIMIT = 120
+
+# Import time budget of the engine entry point (ms), the startup benchmark fails above it
+STARTUP_BUDGET_MS = 300
+STARTUP_RUNS = 5
+
+
+def scale_players(players, n):
+    """
+    Grow (or shrink) the player pool to n players by cloning the real ones under fresh ids, so synthetic
+    pools keep the real position / team / price mix.
+    """
+    store, rows = store_rows(players)
+    i = np.arange(n)
+    rows = rows[i % len(rows)]
+    return store.take(rows, ids=store.ids[rows] + (i // len(players)) * 100000).players()
+
+
+def legacy_build(model, players):
+    """
+    The original list-comprehension model build, kept as the baseline for the build benchmark.
+    """
+    pids = players.keys()
+    team_codes = {p.team_code for p in players.values()}
+
+    x = {(pid, t): model.new_int_var(0, 1, f"x_{pid}") for pid in pids for t in GWS}
+    y = {(pid, t): model.new_int_var(0, 1, f"y_{pid}") for pid in pids for t in GWS}
+
+    for t in GWS:
+        model.add(cp_model.LinearExpr.sum([players[pid].price * x[(pid, t)] for pid in pids]) <= 1000)
+    for t in GWS:
+        model.add(cp_model.LinearExpr.sum([players[pid].price * x[(pid, t)] for pid in pids]) >= 970)
+    for t in GWS:
+        model.add(cp_model.LinearExpr.sum([x[(pid, t)] for pid in pids]) == 15)
+    for pos, n in [(GK, 2), (DEF, 5), (MID, 5), (ATT, 3)]:
+        for t in GWS:
+            model.add(cp_model.LinearExpr.sum([x[(pid, t)] for pid in pids if players[pid].position == pos]) == n)
+    for pos, lo, hi in [(GK, 1, 1), (DEF, 3, 5), (MID, 2, 5), (ATT, 1, 3)]:
+        for t in GWS:
+            model.add(cp_model.LinearExpr.sum([y[(pid, t)] for pid in pids if players[pid].position == pos]) >= lo)
+            model.add(cp_model.LinearExpr.sum([y[(pid, t)] for pid in pids if players[pid].position == pos]) <= hi)
+    for t in GWS:
+        for team_code in team_codes:
+            model.add(cp_model.LinearExpr.sum([x[(pid, t)] for pid in pids if players[pid].team_code == team_code]) <= 3)
+    for t in GWS:
+        model.add(cp_model.LinearExpr.sum([y[(pid, t)] for pid in pids]) == 11)
+    for pid in pids:
+        for t in GWS:
+            model.add(y[(pid, t)] <= x[(pid, t)])
+
+    model.maximize(
+        sum(y[(pid, t)] * players[pid].xp[t] * players[pid].fixture_count[t] for pid in pids for t in GWS)
+        + sum(y[(pid, t)] * sum(3 - diff for diff in players[pid].vs_team_diff[t]) for pid in pids for t in GWS)
+    )
+
+
+def indexed_build(players):
+    build_model(build_index(players), GWS)
+
+
+def bench_build():
+    DL = Dataloader()
+
+    print(f"Model build time over {len(GWS)} GWs")
+    print(f"{'players':>8} {'legacy (s)':>11} {'indexed (s)':>12} {'speedup':>8}")
+    for n in BUILD_POOL_SIZES:
+        players = scale_players(DL.players, n)
+        timings = []
+        for build in [lambda p: legacy_build(cp_model.CpModel(), p), indexed_build]:
+            start = time.perf_counter()
+            build(players)
+            timings.append(time.perf_counter() - start)
+
+        legacy, indexed = timings
+        print(f"{n:>8} {legacy:>11.2f} {indexed:>12.2f} {legacy / indexed:>7.1f}x")
+
+
+def bench_backends():
+    """
+    Build and solve one GW of the squad model (the subproblem the engine solves) on every backend.
+    """
+    DL = Dataloader()
+    index = build_index(presolve(DL.players))
+    gws = GWS[:1]
+
+    print(f"Backends on {SEASON} GW {gws[0]}, {len(index['pids'])} players after presolve")
+    print(f"{'backend':>8} {'build (s)':>10} {'solve (s)':>10} {'objective':>10}  status")
+    for backend in BACKENDS:
+        start = time.perf_counter()
+        model, _ = build_model(index, gws, backend)
+        built = time.perf_counter()
+        status = model.solve(time_limit=BACKEND_TIME_LIMIT)
+        solved = time.perf_counter()
+
+        name = cp_model.cp_model_pb2.CpSolverStatus.Name(status) + (" (LP bound)" if model.relaxation else "")
+        print(f"{backend:>8} {built - start:>10.3f} {solved - built:>10.3f} {model.objective_value:>10.2f}  {name}")
+
+
+def import_times(module):
+    """
+    Cumulative import time (ms) of `module` and of each module it imports directly, from `python -X importtime`.
+    """
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+
+    # a module is printed after everything it imports, one more level of indentation per level of nesting
+    children = {}
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 1:
+            children[name.strip()] = int(cumulative) / 1000
+        elif depth == 0:
+            if name.strip() == module:
+                return {**children, module: int(cumulative) / 1000}
+            children = {}
+    raise RuntimeError(f"No import time reported for {module}")
+
+
+def bench_startup():
+    """
+    Import time of engine.py, best of a few runs, checked against STARTUP_BUDGET_MS so heavy imports don't
+    creep back into the path every invocation (including --help and result cache hits) pays for.
+    """
+    runs = [import_times("engine") for _ in range(STARTUP_RUNS)]
+    best = min(runs, key=lambda times: times["engine"])
+
+    print(f"engine import time: {best['engine']:.1f} ms (budget {STARTUP_BUDGET_MS} ms, best of {STARTUP_RUNS})")
+    imports = sorted(((ms, name) for name, ms in best.items() if name != "engine"), reverse=True)
+    for ms, name in imports[:5]:
+        print(f"{name:>30} {ms:>8.1f} ms")
+
+    if best["engine"] > STARTUP_BUDGET_MS:
+        print("Import time is over budget")
+        sys.exit(1)
+
+
+BENCHMARKS = {"build": bench_build, "backends": bench_backends, "startup": bench_startup}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}', choose from: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,146 +1,383 @@
-import pandas as pd
+import os
+import threading
+from collections import OrderedDict
+
 import numpy as np
-from player import Player
+from fixtures import FixtureIndex, build_fixture_index
+from player import Player, PlayerStore
+from snapshot import load_snapshot, write_snapshot
+from telemetry import TELEMETRY
 
 SEASON = "2025-26"
 CURRENT_GW = 6
 TOTAL_GWS = 38
 GWS = range(CURRENT_GW, TOTAL_GWS + 1)
 
+# Files under data/<season>/ the lookups are built from, and the columns read from each
+SOURCE_FILES = ["players_raw.csv", "teams.csv", "fixtures.csv"]
+PLAYER_COLUMNS = ["id", "first_name", "second_name", "now_cost", "element_type", "team_code", "ep_this", "chance_of_playing_this_round"]
+TEAM_COLUMNS = ["id", "code", "short_name"]
+FIXTURE_COLUMNS = ["event", "kickoff_time", "team_h", "team_a", "team_h_difficulty", "team_a_difficulty"]
+
+# Store columns Dataloader.refresh patches in place (a new team_code also moves the player's fixtures)
+REFRESH_COLUMNS = ["price", "xp", "chance_of_playing", "position", "team_code", "name"]
+
+# Array memory the loaders (and the season tables they share) may hold together, least recently used
+# loaders are dropped above it
+MAX_LOADED_BYTES = 256 * 1024 * 1024
+
 """
-Singleton class for storing and accessing data to be used in the engine
+Data to be used in the engine, one Dataloader per season and gameweek. `Dataloader()` is the loader of SEASON
+from CURRENT_GW, `Dataloader.for_(season, gw)` any other one. Loaders are kept in a registry, so asking again
+hands back the same loader, and every loader of a season shares that season's tables (teams, player columns
+and the fixture index over the whole season).
 """
 
 
-class Dataloader:
-    _instance = None
-    _players: dict[int, Player] = None
+class SeasonTables:
+    """
+    Tables of one season: team lookups, per player columns (players_raw.csv row order) and the fixture index
+    over every GW. Shared by every loader of the season, so the arrays are read-only.
+    """
 
-    def __new__(cls):
-        if cls._instance is None:
-            print("\nCreating a new instance of the DataLoader.")
-            cls._instance = super().__new__(cls)
-        return cls._instance
-
-    def __init__(self):
-        if not hasattr(self, "initialized"):
-            self.initialized = True
-            print("Building lookups")
-            self.build_lookups()
-            print(str(len(self._player_ids)) + " players found\n")
-            self.make_players()
-
-    # Build Player objects
-    def make_players(self):
-        self._players = {}
-        for player_id in self._player_ids:
-            self._players[player_id] = Player(
-                id=player_id,
-                price=self._player_price[player_id],
-                name=self._player_name[player_id],
-                team_name=self._player_team_name[player_id],
-                team_code=self._player_team_code[player_id],
-                team_id=self._team_code_team_id[self._player_team_code[player_id]],
-                position=self._player_position[player_id],
-                chance_of_playing=self._player_chance_of_playing[player_id],
-                vs_team_id={t: self._team_vs_team[self._team_code_team_id[self._player_team[player_id]]] for t in GWS},
-                vs_team_diff={t: self._player_fixture_difficulty[(player_id, t)] for t in GWS},
-                xp={t: self._player_expected_points[(player_id, t)] for t in GWS},
-            )
+    def __init__(self, season, lookups, columns, fixtures, mtime):
+        self.season = season
+        self.team_code_name = dict(lookups["team_code_name"])
+        self.team_id_team_code = dict(lookups["team_id_team_code"])
+        self.columns = columns
+        self.fixtures = fixtures
+        self.mtime = mtime
 
-    @property
-    def players(self):
-        return self._players
+        for array in list(columns.values()) + [getattr(fixtures, name) for name in FixtureIndex.COLUMNS]:
+            array.setflags(write=False)
 
     @property
-    def team_id_team_code(self):
-        return self._team_id_team_code
-    
+    def last_gw(self):
+        return self.fixtures.first_gw + self.fixtures.count.shape[1] - 1
+
     @property
-    def team_code_name(self):
-        return self._team_code_name
+    def nbytes(self):
+        arrays = list(self.columns.values()) + [getattr(self.fixtures, name) for name in FixtureIndex.COLUMNS]
+        return sum(a.nbytes for a in arrays)
+
+
+def source_paths(season):
+    """
+    The SOURCE_FILES of `season`, raising a ValueError naming the ones it doesn't have (the seasons scraped
+    before teams.csv and fixtures.csv were can't be loaded).
+    """
+    paths = [f"data/{season}/{name}" for name in SOURCE_FILES]
+    missing = [name for name, path in zip(SOURCE_FILES, paths) if not os.path.exists(path)]
+    if missing:
+        raise ValueError(f"Season {season} can't be loaded, data/{season}/ has no {', '.join(missing)}")
+    return paths
+
 
-    def build_lookups(self):
-        player_data = pd.read_csv(f"data/{SEASON}/players_raw.csv")
-        team_data = pd.read_csv(f"data/{SEASON}/teams.csv")
-        fixtures = pd.read_csv(f"data/{SEASON}/fixtures.csv")
+def source_mtime(season):
+    return max(os.path.getmtime(path) for path in source_paths(season))
 
-        #########################################################
-        #                   Team Related Data
-        #########################################################
 
-        # Team code -> Team name (1)
-        self._team_code_name = dict(zip(team_data["code"], team_data["short_name"]))
+def load_season(season):
+    """
+    Load the tables of `season` from the compiled snapshot if the source files haven't changed since it was
+    written, otherwise build them from the CSVs and write a new snapshot.
+    """
+    paths = source_paths(season)
+    mtime = source_mtime(season)
 
-        # Player ID -> Team code (2)
-        self._player_team_code = dict(zip(player_data["id"], player_data["team_code"]))
+    with TELEMETRY.phase("snapshot_load"):
+        columns, lookups = load_snapshot(season, paths, {})
+    if columns is not None:
+        fixtures = {name: columns.pop("fixtures_" + name) for name in FixtureIndex.COLUMNS}
+        return SeasonTables(season, lookups, columns, FixtureIndex(**fixtures, gws=[1]), mtime)
 
-        # Player ID -> Team name (uses 1 & 2)
-        self._player_team_name = {
-            player_id: self._team_code_name[team] for player_id, team in zip(player_data["id"], player_data["team_code"])
-        }
+    print(f"Building lookups for {season}")
+    with TELEMETRY.phase("build_lookups"):
+        tables = build_season(season, mtime)
 
-        # Team code -> Team ID
-        self._team_code_team_id = dict(zip(team_data["code"], team_data["id"]))
+    columns = dict(tables.columns)
+    columns.update({"fixtures_" + name: getattr(tables.fixtures, name) for name in FixtureIndex.COLUMNS})
+    lookups = {
+        "team_code_name": [[int(code), name] for code, name in tables.team_code_name.items()],
+        "team_id_team_code": [[int(team_id), int(code)] for team_id, code in tables.team_id_team_code.items()],
+    }
+    write_snapshot(season, paths, {}, columns, lookups)
+    return tables
 
-        # Team ID -> Team code
-        self._team_id_team_code = dict(zip(team_data["id"], team_data["code"]))
 
-        #########################################################
-        #                  Fixture Related Data
-        #########################################################
+def build_season(season, mtime):
+    # only needed when there's no current snapshot, and slow to import
+    import pandas as pd
 
-        self._fixtures_gw = fixtures[fixtures["event"] == CURRENT_GW]
+    with TELEMETRY.phase("csv_load"):
+        player_data = pd.read_csv(f"data/{season}/players_raw.csv", usecols=PLAYER_COLUMNS)
+        team_data = pd.read_csv(f"data/{season}/teams.csv", usecols=TEAM_COLUMNS)
+        fixtures = pd.read_csv(f"data/{season}/fixtures.csv", usecols=FIXTURE_COLUMNS)
 
-        # Team -> Team being played this GW
-        self._team_vs_team = {}
-        for row in self._fixtures_gw.itertuples():
-            self._team_vs_team[row.team_h] = row.team_a
-            self._team_vs_team[row.team_a] = row.team_h
+    #########################################################
+    #                   Team Related Data
+    #########################################################
 
-        # Team -> Opposition team difficultly this GW
-        self._team_diff = {}
-        for row in self._fixtures_gw.itertuples():
-            self._team_diff[row.team_h] = row.team_a_difficulty
-            self._team_diff[row.team_a] = row.team_h_difficulty
+    # Team code -> Team name (1)
+    team_code_name = dict(zip(team_data["code"], team_data["short_name"]))
 
-        #########################################################
-        #                  Player Related Data
-        #########################################################
+    # Team code -> Team ID
+    team_code_team_id = dict(zip(team_data["code"], team_data["id"]))
 
+    # Team ID -> Team code
+    team_id_team_code = dict(zip(team_data["id"], team_data["code"]))
+
+    #########################################################
+    #                  Fixture Related Data
+    #########################################################
+
+    # Team x GW x fixture slot opponent / home / difficulty, and fixtures per team and GW, over the whole season
+    last_gw = int(fixtures["event"].max())
+    fixture_index = build_fixture_index(fixtures, team_data["id"], range(1, last_gw + 1))
+
+    #########################################################
+    #                  Player Related Data
+    #########################################################
+
+    team_code = player_data["team_code"].to_numpy()
+    columns = {
         # Player ID List
-        self._player_ids = list(player_data["id"])
-
-        # Player ID -> Name
-        self._player_name = dict(
-            zip(
-                player_data["id"],
-                map(
-                    lambda n1, n2: n1 + " " + n2,
-                    player_data["first_name"],
-                    player_data["second_name"],
-                ),
-            )
+        "ids": player_data["id"].to_numpy(),
+        # Name
+        "name": (player_data["first_name"] + " " + player_data["second_name"]).to_numpy(dtype=object),
+        # Price (as of now)
+        "price": player_data["now_cost"].to_numpy(),
+        # Position
+        "position": player_data["element_type"].to_numpy(),
+        # Team code / name / ID (name uses 1)
+        "team_code": team_code,
+        "team_name": np.array([team_code_name[team] for team in team_code], dtype=object),
+        "team_id": np.array([team_code_team_id[team] for team in team_code]),
+        # Expected Points this week
+        "xp": player_data["ep_this"].to_numpy(dtype=float),
+        # Chance of playing this week
+        "chance_of_playing": player_data["chance_of_playing_this_round"].to_numpy(dtype=float),
+    }
+
+    lookups = {"team_code_name": team_code_name, "team_id_team_code": team_id_team_code}
+    return SeasonTables(season, lookups, columns, fixture_index, mtime)
+
+
+class Dataloader:
+    # (season, gw) -> loader, least recently used first
+    _registry = OrderedDict()
+    # season -> SeasonTables shared by its loaders
+    _seasons = {}
+    _lock = threading.RLock()
+    max_bytes = MAX_LOADED_BYTES
+
+    _players: dict[int, Player] = None
+    _store: PlayerStore = None
+
+    def __new__(cls, season=SEASON, gw=CURRENT_GW):
+        with cls._lock:
+            key = (season, gw)
+            if key in cls._registry:
+                cls._registry.move_to_end(key)
+                return cls._registry[key]
+
+            print(f"\nCreating a new instance of the DataLoader ({season}, GW {gw}).")
+            loader = super().__new__(cls)
+            loader.season = season
+            loader.gw = gw
+            loader.load()
+            print(str(len(loader._store)) + " players found\n")
+
+            cls._registry[key] = loader
+            cls.evict(keep=key)
+            return loader
+
+    @classmethod
+    def for_(cls, season, gw):
+        return cls(season, gw)
+
+    @classmethod
+    def season_tables(cls, season):
+        with cls._lock:
+            tables = cls._seasons.get(season)
+            if tables is None or tables.mtime != source_mtime(season):
+                tables = cls._seasons[season] = load_season(season)
+            return tables
+
+    @classmethod
+    def evict(cls, keep=None, max_bytes=None):
+        """
+        Drop least recently used loaders (never `keep`) until the loaders and the season tables they use fit
+        in `max_bytes`, then the tables of seasons no loader uses any more.
+        """
+        max_bytes = cls.max_bytes if max_bytes is None else max_bytes
+        with cls._lock:
+
+            def loaded_bytes():
+                seasons = {loader.season for loader in cls._registry.values()}
+                return sum(loader.nbytes for loader in cls._registry.values()) + sum(cls._seasons[s].nbytes for s in seasons if s in cls._seasons)
+
+            for key in list(cls._registry):
+                if loaded_bytes() <= max_bytes:
+                    break
+                if key != keep:
+                    del cls._registry[key]
+
+            in_use = {loader.season for loader in cls._registry.values()}
+            for season in list(cls._seasons):
+                if season not in in_use:
+                    del cls._seasons[season]
+
+    def load(self):
+        tables = self.season_tables(self.season)
+        self.mtimes = {path: os.path.getmtime(path) for path in self.source_paths()}
+        self.gws = range(self.gw, tables.last_gw + 1)
+        self._team_code_name = tables.team_code_name
+        self._team_id_team_code = tables.team_id_team_code
+        self._fixtures = tables.fixtures
+        with TELEMETRY.phase("make_players"):
+            self.make_players(tables)
+
+    def reload(self):
+        print("Reloading data")
+        self.load()
+
+    def refresh(self):
+        """
+        Bring the loader up to date with the source files. When only players_raw.csv changed and the player
+        pool is the same, the rows whose REFRESH_COLUMNS changed are patched in the store; anything else
+        reloads. Returns the change set: player ids per changed column (plus "added" / "removed" ones),
+        "players" for all of them and "reloaded" when the whole store was rebuilt. The season's shared
+        tables, and other loaders of the season, are left alone.
+        """
+        import pandas as pd
+
+        mtimes = {path: os.path.getmtime(path) for path in self.source_paths()}
+        changes = {name: [] for name in REFRESH_COLUMNS}
+        changes.update({"added": [], "removed": [], "players": [], "reloaded": False})
+        if mtimes == self.mtimes:
+            return changes
+
+        players_raw = f"data/{self.season}/players_raw.csv"
+        player_data = pd.read_csv(players_raw, usecols=PLAYER_COLUMNS)
+        store = self._store
+
+        ids = player_data["id"].to_numpy()
+        added = sorted(set(ids.tolist()) - set(store.row))
+        removed = sorted(set(store.row) - set(ids.tolist()))
+        other_changed = any(mtimes[path] != self.mtimes[path] for path in mtimes if path != players_raw)
+        if added or removed or other_changed:
+            old_ids = set(store.row)
+            self.reload()
+            changes.update({"added": added, "removed": removed, "players": sorted(old_ids | set(self._store.row)), "reloaded": True})
+            return changes
+
+        with TELEMETRY.phase("refresh"):
+            rows = np.fromiter((store.row[pid] for pid in ids.tolist()), dtype=np.int64, count=len(ids))
+            new = {
+                "price": player_data["now_cost"].to_numpy(),
+                "xp": player_data["ep_this"].to_numpy(dtype=float),
+                "chance_of_playing": player_data["chance_of_playing_this_round"].to_numpy(dtype=float),
+                "position": player_data["element_type"].to_numpy(),
+                "team_code": player_data["team_code"].to_numpy(),
+                "name": (player_data["first_name"] + " " + player_data["second_name"]).to_numpy(dtype=object),
+            }
+            # xP is the same in every GW of the store
+            old = {name: (store.xp[:, 0] if name == "xp" else getattr(store, name))[rows] for name in REFRESH_COLUMNS}
+
+            for name in REFRESH_COLUMNS:
+                changed = old[name] != new[name]
+                if new[name].dtype.kind == "f":
+                    changed &= ~(np.isnan(old[name]) & np.isnan(new[name]))
+                changed_rows = rows[changed]
+                if not len(changed_rows):
+                    continue
+
+                values = new[name][changed]
+                if name == "xp":
+                    store.xp[changed_rows] = values[:, None]
+                elif name == "team_code":
+                    self.move_teams(changed_rows, values)
+                else:
+                    getattr(store, name)[changed_rows] = values
+                changes[name] = store.ids[changed_rows].tolist()
+
+        changes["players"] = sorted(set().union(*(changes[name] for name in REFRESH_COLUMNS)))
+        self.mtimes = mtimes
+        return changes
+
+    def move_teams(self, rows, team_codes):
+        """
+        Move the players at store `rows` to the teams of `team_codes`, fixtures included.
+        """
+        store, fixtures = self._store, self._fixtures
+        team_code_team_id = {code: team_id for team_id, code in self._team_id_team_code.items()}
+        team_ids = [team_code_team_id[code] for code in team_codes]
+
+        store.team_code[rows] = team_codes
+        store.team_name[rows] = [self._team_code_name[code] for code in team_codes]
+        store.team_id[rows] = team_ids
+
+        team_rows = fixtures.rows(team_ids)
+        first = self.gw - fixtures.first_gw
+        store.fixture_count[rows] = fixtures.count[team_rows, first:]
+        store.vs_team_id[rows] = fixtures.opponent[team_rows, first:]
+        store.vs_team_diff[rows] = fixtures.difficulty[team_rows, first:]
+        store.home[rows] = fixtures.home[team_rows, first:]
+
+    def source_paths(self):
+        return source_paths(self.season)
+
+    def source_mtime(self):
+        return source_mtime(self.season)
+
+    # Build the player store from the season's tables, from this loader's GW on, and a Player view over each of its rows
+    def make_players(self, tables):
+        columns = tables.columns
+        fixtures = tables.fixtures
+
+        # each player's fixtures are their team's
+        rows = fixtures.rows(columns["team_id"])
+        first = self.gw - fixtures.first_gw
+        # own copies of the (small) per player columns, the store's are writable
+        self._store = PlayerStore(
+            ids=columns["ids"].copy(),
+            price=columns["price"].copy(),
+            name=columns["name"].copy(),
+            team_name=columns["team_name"].copy(),
+            team_code=columns["team_code"].copy(),
+            team_id=columns["team_id"].copy(),
+            position=columns["position"].copy(),
+            chance_of_playing=columns["chance_of_playing"].copy(),
+            gws=self.gws,
+            fixture_count=fixtures.count[rows, first:],
+            vs_team_id=fixtures.opponent[rows, first:],
+            vs_team_diff=fixtures.difficulty[rows, first:],
+            home=fixtures.home[rows, first:],
+            xp=np.repeat(np.asarray(columns["xp"], dtype=float)[:, None], len(self.gws), axis=1),
         )
+        self._players = self._store.players()
 
-        # Player ID -> Price (as of now)
-        self._player_price = dict(zip(player_data["id"], player_data["now_cost"]))
+    @property
+    def nbytes(self):
+        return sum(getattr(self._store, name).nbytes for name in PlayerStore.COLUMNS)
 
-        # Player ID -> Expected Points this week
-        self._player_expected_points = {(player_id, t): xp for player_id, xp in zip(player_data["id"], player_data["ep_this"]) for t in GWS}
+    @property
+    def players(self):
+        return self._players
 
-        # Player ID -> Position
-        self._player_position = {player_id: pos for player_id, pos in zip(player_data["id"], player_data["element_type"])}
+    @property
+    def store(self):
+        return self._store
 
-        # Player ID -> Team Code
-        self._player_team = {player_id: team_code for player_id, team_code in zip(player_data["id"], player_data["team_code"])}
+    @property
+    def fixtures(self):
+        return self._fixtures
 
-        # Fixture Difficulty next week
-        self._player_fixture_difficulty = {
-            (player_id, t): self._team_diff[self._team_vs_team[self._team_code_team_id[team_code]]]
-            for player_id, team_code in zip(player_data["id"], player_data["team_code"])
-            for t in GWS
-        }
+    @property
+    def team_id_team_code(self):
+        return self._team_id_team_code
 
-        # Chance of playing this week
-        self._player_chance_of_playing = dict(zip(player_data["id"], player_data["chance_of_playing_this_round"]))
+    @property
+    def team_code_name(self):
+        return self._team_code_name
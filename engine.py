@@ -1,6 +1,22 @@
-from ortools.init.python import init
-from ortools.sat.python import cp_model
-from dataloader import Dataloader, GWS
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from ortools.sat import cp_model_pb2
+from backends import BACKENDS, make_backend
+from dataloader import Dataloader, GWS, SEASON, CURRENT_GW
+from hints import load_hints, save_hints, add_hints, hint_stats
+from player import store_rows
+from presolve import reduce_players
+from result_cache import cache_key, load_result, store_result
+from solve_result import EXPORT_FORMATS, SolveResult, parquet_engine
+from telemetry import TELEMETRY
 
 GK = 1
 DEF = 2
@@ -10,163 +26,487 @@ ATT = 4
 POS_LOOKUP = {GK: "GK", DEF: "DEF", MID: "MID", ATT: "ATT"}
 
 
-def run_engine():
-    print("Google OR-Tools version:", init.OrToolsVersion.version_string())
+# Squad rules
+BUDGET = 1000
+MIN_SPEND = 970
+SQUAD_SIZE = 15
+XI_SIZE = 11
+MAX_PER_TEAM = 3
+SQUAD_POS = {GK: 2, DEF: 5, MID: 5, ATT: 3}
+XI_POS = {GK: (1, 1), DEF: (3, 5), MID: (2, 5), ATT: (1, 3)}
 
-    # Create the model and solver with the CP-SAT backend.
-    model = cp_model.CpModel()
-    if not model:
-        print("Could not create modal CP-SAT")
-        return
+# Seconds to keep spare before the deadline when the time budget comes from it
+DEADLINE_MARGIN = 600
 
-    solver = cp_model.CpSolver()
-    if not solver:
-        print("Could not create solver CP-SAT")
-        return
+# The scrapers and API getters, the deadline is fetched through them
+UTIL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "util")
+
+# Least time a gameweek subproblem gets under a time budget, enough to find a feasible squad
+MIN_TIME_SLICE = 0.5
+
+# Constraint types is_separable knows how to read the variables of
+SEPARABLE_CHECKED = {"linear", "bool_and", "bool_or", "at_most_one", "exactly_one"}
 
-    # Fetch data from dataloader singleton
-    DL = Dataloader()
-    players = DL.players
-    pids = players.keys()
 
-    x = {(pid, t): model.new_int_var(0, 1, f"x_{pid}") for pid in pids for t in GWS}
-    y = {(pid, t): model.new_int_var(0, 1, f"y_{pid}") for pid in pids for t in GWS}
+def run_engine(time_limit=None, stream_path=None, backend="cp-sat", use_cache=True, output=None):
+    """
+    Pick the squads for the horizon. `time_limit` (seconds) turns on anytime solving: every subproblem stops
+    when the budget runs out and reports the best squad found so far. `stream_path` streams every improving
+    squad as it is found, to stdout ("-") or as JSON lines appended to a file (CP-SAT only). `backend` is
+    one of backends.BACKENDS. Optimal results are cached on disk by their model inputs unless `use_cache`
+    is False. Returns the SolveResult, also exported to `output` (.json, .csv or .parquet) if given.
+    """
+    start = time.perf_counter()
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+    stream = None
+    if stream_path:
+        from streaming import SolutionStream
 
-    var = [x, y]
+        stream = SolutionStream(None if stream_path == "-" else stream_path)
 
-    model = build_constraints(model, var)
+    # Fetch data from dataloader singleton
+    DL = Dataloader()
+    with TELEMETRY.phase("presolve"):
+        players = presolve(DL.players)
+        index = build_index(players)
 
-    # OBJECTIVE FUNCTION
-    model.maximize(
-        sum(y[(pid, t)] * players[pid].xp[t] for pid in pids for t in GWS)
-        + sum(y[(pid, t)] * (3 - players[pid].vs_team_diff[t]) for pid in pids for t in GWS)
+    with TELEMETRY.phase("cache_lookup"):
+        values = dict(zip(index["pids"], index["values"]))
+        key = cache_key(index, GWS, values, model_params(backend))
+        result = load_result(key) if use_cache else None
+
+    if result:
+        print(f"Result cache hit ({key[:12]})\n")
+    else:
+        from ortools.init.python import init
+
+        print("Google OR-Tools version:", init.OrToolsVersion.version_string())
+        print(f"Solving with {backend}")
+
+        # warm start from the squads picked by the last run of this season
+        hints = load_hints(SEASON, CURRENT_GW, GWS)
+
+        if is_separable(index):
+            result = solve_separable(index, hints, deadline, stream, backend)
+        else:
+            print("Constraints link gameweeks, solving the horizon as a single model")
+            result = solve(index, GWS, hints=hints, deadline=deadline, stream=stream, backend=backend)
+
+        # anything short of optimal depends on the time budget, so isn't worth reusing
+        if use_cache and result["status"] == cp_model_pb2.OPTIMAL:
+            store_result(key, result)
+
+    if stream:
+        stream.close()
+
+    # a run that left gameweeks without a squad would hint the next one with older squads for them
+    if len(result["gws"]) == len(GWS):
+        save_hints(result, SEASON, CURRENT_GW)
+    elif result["gws"]:
+        print(f"Only {len(result['gws'])} of {len(GWS)} gameweeks solved, not saved as hints")
+
+    solve_result = make_solve_result(result, index, values)
+    display(solve_result, result)
+    if output:
+        solve_result.export(output)
+        print(f"Result written to {output}")
+    print(f"wall time - {time.perf_counter() - start} s\n")
+    return solve_result
+
+
+def model_params(backend):
+    """
+    Everything besides the player table that decides the optimum, for the result cache key.
+    """
+    return {
+        "budget": BUDGET,
+        "min_spend": MIN_SPEND,
+        "squad_size": SQUAD_SIZE,
+        "xi_size": XI_SIZE,
+        "max_per_team": MAX_PER_TEAM,
+        "squad_pos": SQUAD_POS,
+        "xi_pos": XI_POS,
+        "backend": backend,
+    }
+
+
+def presolve(players):
+    values = dict(zip(players, player_values(players, GWS)))
+    kept, report = reduce_players(players, values, SQUAD_POS, SQUAD_SIZE, MAX_PER_TEAM, equal_price_only=MIN_SPEND > 0)
+
+    removed = report["players"] - report["kept"]
+    print(
+        f"Presolve removed {removed} of {report['players']} players ({report['unavailable']} unavailable, {report['dominated']} dominated), "
+        f"{2 * removed * len(GWS)} variables\n"
     )
+    return kept
+
+
+def build_index(players):
+    """
+    Precompute the membership lists used by every constraint and the objective coefficients, so the model
+    build never rescans the player pool. Players are addressed by their position in `pids`.
+    """
+    pids = list(players.keys())
+    by_pos = {pos: [] for pos in POS_LOOKUP}
+    by_team = {}
+    for i, pid in enumerate(pids):
+        by_pos[players[pid].position].append(i)
+        by_team.setdefault(players[pid].team_code, []).append(i)
+
+    return {
+        "players": players,
+        "pids": pids,
+        "price": [players[pid].price for pid in pids],
+        "values": player_values(players, GWS),
+        "by_pos": by_pos,
+        "by_team": by_team,
+    }
+
+
+def build_model(index, gws, backend="cp-sat"):
+    model = make_backend(backend)
+    with TELEMETRY.phase("variables"):
+        var = build_vars(model, index, gws)
+    with TELEMETRY.phase("constraints"):
+        build_constraints(model, var, index, gws)
+    with TELEMETRY.phase("objective"):
+        build_objective(model, var, index, gws)
+    return model, var
+
+
+def build_vars(model, index, gws):
+    pids = index["pids"]
+    x = {(pid, t): model.new_bool(f"x_{pid}_{t}") for t in gws for pid in pids}
+    y = {(pid, t): model.new_bool(f"y_{pid}_{t}") for t in gws for pid in pids}
+    return [x, y]
+
+
+def player_values(players, gws, xp_overrides=None):
+    """
+    Objective coefficient of every player in every GW of `gws`, as a players x GWs matrix in `players` order.
+    `xp_overrides` ({pid: xp}) replaces the stored expected points of those players in every GW.
+    """
+    store, rows = store_rows(players)
+    cols = np.array([store.col(t) for t in gws])
+    xp = store.xp[np.ix_(rows, cols)]
+    if xp_overrides:
+        for k, pid in enumerate(players):
+            if pid in xp_overrides:
+                xp[k] = xp_overrides[pid]
+    diff = store.vs_team_diff[np.ix_(rows, cols)]
+    played = np.arange(diff.shape[2]) < store.fixture_count[np.ix_(rows, cols)][..., None]
+
     # in this niave model, a fixture difficultly of '1' gives the player an XP of +2, '2' is +1, '3' is 0, '4' is -1 and '5' is -2,
-    # this is done via the linear function 3 - DF
+    # this is done via the linear function 3 - DF. Summed over the GW's fixtures, a blank GW is worth nothing
+    return ((xp[..., None] + 3 - diff) * played).sum(axis=2)
+
+
+def objective_coeffs(index, t):
+    return index["values"][:, GWS.index(t)].tolist()
+
 
-    solve(model, solver, var)
+def build_objective(model, var, index, gws):
+    _, y = var
 
+    ys, coeffs = [], []
+    for t in gws:
+        ys += [y[(pid, t)] for pid in index["pids"]]
+        coeffs += objective_coeffs(index, t)
 
-def build_constraints(model, var):
+    model.maximize(ys, coeffs)
+
+
+def build_constraints(model, var, index, gws):
     x, y = var
+    pids, price = index["pids"], index["price"]
 
-    # Fetch data from dataloader singleton
-    DL = Dataloader()
-    players = DL.players
-    pids = players.keys()
-
-    # cost constraint
-    for t in GWS:
-        model.add(
-            cp_model.LinearExpr.sum([players[pid].price * x[(pid, t)] for pid in pids]) <= 1000
-        )  # TODO: somehow project player price and add it to the data?
-
-    # we generally want to have most of our money in the team (TODO: this constraint MIGHT be removed later)
-    for t in GWS:
-        model.add(cp_model.LinearExpr.sum([players[pid].price * x[(pid, t)] for pid in pids]) >= 970)
-
-    # number of players in squad constraint
-    for t in GWS:
-        model.add(cp_model.LinearExpr.sum([x[(pid, t)] for pid in pids]) == 15)
-
-    # 2 GKs allowed
-    for t in GWS:
-        model.add(cp_model.LinearExpr.sum([x[(pid, t)] for pid in pids if players[pid].position == GK]) == 2)
-
-    # 5 DEFs allowed
-    for t in GWS:
-        model.add(cp_model.LinearExpr.sum([x[(pid, t)] for pid in pids if players[pid].position == DEF]) == 5)
-
-    # 5 MIDs allowed
-    for t in GWS:
-        model.add(cp_model.LinearExpr.sum([x[(pid, t)] for pid in pids if players[pid].position == MID]) == 5)
-
-    # 3 ATTs allowed
-    for t in GWS:
-        model.add(cp_model.LinearExpr.sum([x[(pid, t)] for pid in pids if players[pid].position == ATT]) == 3)
-
-    # 1 GK on the field
-    for t in GWS:
-        model.add(cp_model.LinearExpr.sum([y[(pid, t)] for pid in pids if players[pid].position == GK]) == 1)
-
-    # 3-5 DEFs on the field
-    for t in GWS:
-        model.add(cp_model.LinearExpr.sum([y[(pid, t)] for pid in pids if players[pid].position == DEF]) >= 3)
-        model.add(cp_model.LinearExpr.sum([y[(pid, t)] for pid in pids if players[pid].position == DEF]) <= 5)
-
-    # 2-5 MIDs on the field
-    for t in GWS:
-        model.add(cp_model.LinearExpr.sum([y[(pid, t)] for pid in pids if players[pid].position == MID]) >= 2)
-        model.add(cp_model.LinearExpr.sum([y[(pid, t)] for pid in pids if players[pid].position == MID]) <= 5)
-
-    # 1-3 ATTs on the field
-    for t in GWS:
-        model.add(cp_model.LinearExpr.sum([y[(pid, t)] for pid in pids if players[pid].position == ATT]) >= 1)
-        model.add(cp_model.LinearExpr.sum([y[(pid, t)] for pid in pids if players[pid].position == ATT]) <= 3)
-
-    # # max 3 players per team
-    for t in GWS:
-        for team_code in DL.team_code_name.keys():
-            model.add(cp_model.LinearExpr.sum([x[(pid, t)] for pid in pids if players[pid].team_code == team_code]) <= 3)
-
-    # max 11 players on the field
-    for t in GWS:
-        model.add(cp_model.LinearExpr.sum([y[(pid, t)] for pid in pids]) == 11)
-
-    # a player must be in the team in order to be on the field
-    for pid in pids:
-        for t in GWS:
-            model.add(y[(pid, t)] <= x[(pid, t)])
-
-    # # don't play any players that are potentially injured / dont exist (cut constraint)
-    # for pid in pids:
-    #     for t in GWS:
-    #         if DL.player_chance_of_playing[pid] < 75:
-    #             model.add(y[(pid, t)] == 0)
+    for t in gws:
+        xs = [x[(pid, t)] for pid in pids]
+        ys = [y[(pid, t)] for pid in pids]
 
-    return model
+        # cost constraint, we generally want to have most of our money in the team (TODO: the lower bound MIGHT be removed later)
+        model.rows[("cost", t)] = model.add_linear(xs, price, MIN_SPEND, BUDGET)  # TODO: somehow project player price and add it to the data?
 
+        # number of players in squad / on the field
+        model.add_sum(xs, SQUAD_SIZE, SQUAD_SIZE)
+        model.add_sum(ys, XI_SIZE, XI_SIZE)
 
-def solve(model, solver, var):
-    status = solver.solve(model)
+        # squad and on-field counts per position (2 GK, 5 DEF, 5 MID, 3 ATT / 1 GK, 3-5 DEF, 2-5 MID, 1-3 ATT)
+        for pos, members in index["by_pos"].items():
+            model.add_sum([xs[i] for i in members], SQUAD_POS[pos], SQUAD_POS[pos])
+            lo, hi = XI_POS[pos]
+            model.add_sum([ys[i] for i in members], lo, hi)
 
-    # Fetch data from dataloader singleton
-    DL = Dataloader()
-    players = DL.players
+        # max 3 players per team
+        for members in index["by_team"].values():
+            model.add_sum([xs[i] for i in members], 0, MAX_PER_TEAM)
+
+        # a player must be in the team in order to be on the field
+        for i in range(len(pids)):
+            model.add_implication(ys[i], xs[i])
+
+    return model
+
+
+def is_separable(index):
+    """
+    True if no constraint mentions variables from two different gameweeks, i.e. every GW can be solved on
+    its own. Checked on a two-GW probe model: every GW is emitted by the same code, so any linking
+    constraint shows up there. Constraint types we can't read are treated as linking.
+    """
+    if len(GWS) < 2:
+        return True
+
+    model, var = build_model(index, GWS[:2])
+    gw_of = {v.index: t for vs in var for (_, t), v in vs.items()}
+
+    for ct in model.model.proto.constraints:
+        kind = ct.WhichOneof("constraint")
+        if kind not in SEPARABLE_CHECKED:
+            return False
+
+        body = getattr(ct, kind)
+        refs = list(ct.enforcement_literal) + list(body.vars if kind == "linear" else body.literals)
+        if len({gw_of[r if r >= 0 else -r - 1] for r in refs}) > 1:
+            return False
+
+    return True
+
+
+def deadline_budget(margin=DEADLINE_MARGIN):
+    """
+    Seconds left until the next FPL deadline, less `margin`, or None when there is no deadline left or it
+    can't be fetched (the API is down or answers something else), so the run falls back to --time-limit.
+    """
+    # the util scripts import each other as top-level modules
+    if UTIL_DIR not in sys.path:
+        sys.path.insert(0, UTIL_DIR)
+    from gameweek import get_next_deadline
+
+    try:
+        deadline = get_next_deadline()
+    # requests.RequestException when the API can't be reached, KeyError / ValueError for a payload without
+    # the deadlines, and get_json raises a bare Exception for an error status
+    except Exception as e:
+        print(f"Warning: couldn't get the next deadline ({e!r}), no deadline budget")
+        return None
+    if deadline is None:
+        return None
+    return max(0.0, (deadline - datetime.utcnow()).total_seconds() - margin)
+
+
+def solve_separable(index, hints=None, deadline=None, stream=None, backend="cp-sat"):
+    """
+    Solve every gameweek as its own subproblem on a thread pool (CP-SAT releases the GIL). Gameweeks whose
+    objective coefficients are identical are the same subproblem, so each distinct one is solved once and
+    its result shared. Under a `deadline` each subproblem gets an equal slice of it as it starts (see
+    time_slicer).
+    """
+    groups = group_subproblems(index, GWS)
+
+    cores = os.cpu_count() or 1
+    pool_size = min(len(groups), cores)
+    print(f"{len(GWS)} gameweeks, {len(groups)} distinct subproblems, solving on {pool_size} threads\n")
+
+    next_deadline = time_slicer(deadline, len(groups), pool_size) if deadline is not None else lambda: None
+    with ThreadPoolExecutor(max_workers=pool_size) as pool:
+        futures = [
+            pool.submit(lambda t: solve(index, [t], max(1, cores // pool_size), hints, next_deadline(), stream, backend), gws[0])
+            for gws in groups
+        ]
+        subresults = [f.result() for f in futures]
+
+    # Fan each subproblem's result out to every GW that shares it
+    result = {
+        "status": combine_status([r["status"] for r in subresults]),
+        "objective": 0,
+        "conflicts": 0,
+        "branches": 0,
+        "hints": {"hinted": 0, "kept": 0, "missing": 0},
+        "relaxation": subresults[0]["relaxation"],
+        "gws": {},
+    }
+    for gws, r in zip(groups, subresults):
+        # a subproblem out of time without a squad has no objective to add
+        if gws[0] in r["gws"] or r["relaxation"]:
+            result["objective"] += r["objective"] * len(gws)
+        result["conflicts"] += r["conflicts"]
+        result["branches"] += r["branches"]
+        for key, n in r["hints"].items():
+            result["hints"][key] += n * len(gws)
+        if gws[0] in r["gws"]:
+            for t in gws:
+                result["gws"][t] = r["gws"][gws[0]]
+
+    return result
+
+
+def time_slicer(deadline, count, pool_size):
+    """
+    Deadline maker for `count` subproblems run on `pool_size` threads, i.e. ceil(count / pool_size) waves of
+    them. The time left now is split into one equal slice per wave, and each call (one per subproblem, as it
+    starts) gives its subproblem a slice from then on, so every subproblem gets the same time whatever its
+    place in the queue. The last wave runs to `deadline`, getting whatever earlier waves left over. No
+    subproblem gets less than MIN_TIME_SLICE, so a late one still finds a squad.
+    """
+    waves = math.ceil(count / pool_size)
+    time_slice = max(MIN_TIME_SLICE, (deadline - time.monotonic()) / waves)
+    lock = threading.Lock()
+    started = [0]
+
+    def next_deadline():
+        with lock:
+            wave = started[0] // pool_size
+            started[0] += 1
+        now = time.monotonic()
+        if wave >= waves - 1:
+            return max(deadline, now + MIN_TIME_SLICE)
+        return now + time_slice
+
+    return next_deadline
+
+
+def group_subproblems(index, gws):
+    """
+    Split `gws` into groups of GWs with identical objective coefficients, i.e. the same subproblem.
+    """
+    groups = {}
+    for t in gws:
+        groups.setdefault(tuple(objective_coeffs(index, t)), []).append(t)
+    return list(groups.values())
+
+
+def combine_status(statuses):
+    if all(s == cp_model_pb2.OPTIMAL for s in statuses):
+        return cp_model_pb2.OPTIMAL
+    if all(s in (cp_model_pb2.OPTIMAL, cp_model_pb2.FEASIBLE) for s in statuses):
+        return cp_model_pb2.FEASIBLE
+    return next(s for s in statuses if s not in (cp_model_pb2.OPTIMAL, cp_model_pb2.FEASIBLE))
+
+
+def solve(index, gws, num_workers=0, hints=None, deadline=None, stream=None, backend="cp-sat"):
+    """
+    Build and solve the model over `gws`, returning the squad and XI picked for each GW. `hints` maps GW ->
+    a previously picked squad to warm start from, `deadline` is a time.monotonic() to stop by and `stream`
+    receives every improving solution. The LP relaxation backend only returns the objective bound.
+    """
+    model, var = build_model(index, gws, backend)
+
+    # the relaxation has no squad to compare the hint with
+    hints = (hints or {}) if not model.relaxation else {}
+    missing = {t: add_hints(model, var, index["pids"], t, hints[t]) for t in gws if t in hints}
+
+    time_limit = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+    callback = None
+    if stream and model.streams:
+        from streaming import SquadStreamer
+
+        callback = SquadStreamer(stream, var, index["pids"], gws)
+    with TELEMETRY.phase("solve"):
+        status = model.solve(num_workers, time_limit, callback)
 
     # unpack vars
     x, y = var
-
-    print(f"Status: {status}")
-    if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
-        results: list[Player] = {}
-
-        # Collect results
-        for [(id, t), x_val] in x.items():
-            if solver.value(x_val):
-                if results.get(t):
-                    results[t] += [players[id]]
-                else:
-                    results[t] = [players[id]]
-
-        # Display
-        for t in reversed(GWS):
-            total_cost = 0
-            print(f"GAMEWEEK {t}")
+    pids = index["pids"]
+
+    result = {
+        "status": status,
+        "objective": model.objective_value,
+        "conflicts": model.conflicts,
+        "branches": model.branches,
+        "hints": {"hinted": 0, "kept": 0, "missing": 0},
+        "relaxation": model.relaxation,
+        "gws": {},
+    }
+    if (status == cp_model_pb2.OPTIMAL or status == cp_model_pb2.FEASIBLE) and not model.relaxation:
+        with TELEMETRY.phase("extract"):
+            # read every x and y in one go, as a GW x player matrix each
+            shape = (len(gws), len(pids))
+            xv = model.values([x[(pid, t)] for t in gws for pid in pids]).reshape(shape)
+            yv = model.values([y[(pid, t)] for t in gws for pid in pids]).reshape(shape)
+            for k, t in enumerate(gws):
+                result["gws"][t] = {"squad": [pids[i] for i in np.flatnonzero(xv[k])], "xi": [pids[i] for i in np.flatnonzero(yv[k])]}
+
+    if TELEMETRY.enabled:
+        TELEMETRY.record_solve(
+            {
+                "gws": list(gws),
+                "backend": model.name,
+                "status": cp_model_pb2.CpSolverStatus.Name(status),
+                "objective": result["objective"],
+                "bound": model.best_bound,
+                **model.stats(),
+            }
+        )
+
+    for t, n in missing.items():
+        for key, v in hint_stats(hints[t], result["gws"].get(t), n).items():
+            result["hints"][key] += v
+
+    return result
+
+
+def make_solve_result(result, index, values):
+    """
+    SolveResult of an engine result, `values` mapping pid -> objective coefficient per GW of GWS.
+    """
+    DL = Dataloader()
+    players = index["players"]
+
+    gameweeks = []
+    for k, t in enumerate(GWS):
+        if t not in result["gws"]:
+            continue
+
+        picks = result["gws"][t]
+        squad = [players[pid] for pid in picks["squad"]]
+        cost = sum(p.price for p in squad)
+        gameweeks.append(
+            {
+                "gw": t,
+                "cost": cost,
+                "bank": BUDGET - cost,
+                "objective": sum(values[pid][k] for pid in picks["xi"]),
+                "xi": picks["xi"],
+                "squad": [
+                    {
+                        "id": p.id,
+                        "name": p.name,
+                        "team": p.team_name,
+                        "position": POS_LOOKUP[p.position],
+                        "price": p.price,
+                        "vs": ", ".join(DL.team_code_name[DL.team_id_team_code[vs]] for vs in p.vs_team_id[t]) or "-",
+                        "value": values[p.id][k],
+                    }
+                    for p in squad
+                ],
+            }
+        )
+
+    status = cp_model_pb2.CpSolverStatus.Name(result["status"])
+    return SolveResult(status, result["objective"], result["relaxation"], gameweeks)
+
+
+def display(solve_result, result):
+    print(f"Status: {result['status']}")
+    if solve_result.relaxation:
+        print("LP relaxation: the objective is an upper bound, no squads picked")
+    elif solve_result.gameweeks:
+        for gw in reversed(solve_result.gameweeks):
+            xi = set(gw["xi"])
+            print(f"GAMEWEEK {gw['gw']}")
             print("------------------------------------------------------")
-            for pos_value, pos_name in POS_LOOKUP.items():  # for each position, find all players for this GW
+            for pos_name in POS_LOOKUP.values():  # for each position, find all players for this GW
                 print(f"{pos_name}:")
-                for p in [r for r in results[t] if r.position == pos_value]:
-                    total_cost += p.price / 10
-                    playing = " - PLAYING" if solver.value(y[(p.id, t)]) else ""
-                    vs = DL.team_code_name[DL.team_id_team_code[p._vs_team_id[t]]]
-
-                    print(f"({p.team_name}) {p.name} ({p.id}) (price: {p.price / 10}) vs ({vs})", playing)
+                for p in [r for r in gw["squad"] if r["position"] == pos_name]:
+                    playing = " - PLAYING" if p["id"] in xi else ""
+                    print(f"({p['team']}) {p['name']} ({p['id']}) (price: {p['price'] / 10}) vs ({p['vs']})", playing)
 
                 print("")
 
-            print("Team Value: " + str(round(total_cost, 1)))
-            print("Money in Bank: " + str(round(100 - total_cost, 1)))
+            print("Team Value: " + str(round(gw["cost"] / 10, 1)))
+            print("Money in Bank: " + str(round(gw["bank"] / 10, 1)))
             print("")
 
         print("------------------------------------------------------")
@@ -175,15 +515,61 @@ def solve(model, solver, var):
         print("No solution found.")
 
     print("\nStatistics:")
-    print(f"Maximum of objective function: {round(solver.objective_value)} ({round(solver.objective_value / len(GWS))} per GW)")
-    print(f"status    - {solver.status_name(status)}")
-    print(f"conflicts - {solver.num_conflicts}")
-    print(f"branches  - {solver.num_branches}")
-    print(f"wall time - {solver.wall_time} s\n")
+    # per GW over the gameweeks that got a squad (all of them for the relaxation's bound)
+    solved = len(result["gws"]) or len(GWS)
+    print(f"Maximum of objective function: {round(result['objective'])} ({round(result['objective'] / solved)} per GW)")
+    if result["gws"] and len(result["gws"]) < len(GWS):
+        print(f"solved    - {len(result['gws'])} of {len(GWS)} gameweeks")
+    print(f"status    - {solve_result.status}")
+    print(f"conflicts - {result['conflicts']}")
+    print(f"branches  - {result['branches']}")
+    if result["hints"]["hinted"]:
+        hints = result["hints"]
+        print(f"hints     - {hints['kept']}/{hints['hinted']} hinted squad picks kept, {hints['missing']} no longer in the pool")
 
 
 def main():
-    run_engine()
+    parser = argparse.ArgumentParser(description="Pick FPL squads for the horizon")
+    parser.add_argument("--backend", choices=BACKENDS, default="cp-sat", help="solver the squad model is emitted to (default cp-sat)")
+    parser.add_argument("--time-limit", type=float, help="stop searching after this many seconds and use the best squad so far")
+    parser.add_argument(
+        "--until-deadline",
+        action="store_true",
+        help=f"time limit from the next FPL deadline, keeping --deadline-margin seconds spare (default {DEADLINE_MARGIN})",
+    )
+    parser.add_argument("--deadline-margin", type=float, default=DEADLINE_MARGIN)
+    parser.add_argument("--telemetry", metavar="DIR", help="write phase timings and solver statistics to DIR/telemetry.json and DIR/telemetry.prom")
+    parser.add_argument("--output", metavar="FILE", help="export the picked squads to FILE (.json, .csv or .parquet)")
+    parser.add_argument("--no-cache", action="store_true", help="always solve, ignoring and not updating the result cache")
+    parser.add_argument(
+        "--stream", nargs="?", const="-", metavar="FILE", help="stream each improving squad to stdout, or as JSON lines to FILE"
+    )
+    args = parser.parse_args()
+
+    if args.output and os.path.splitext(args.output)[1].lower() not in EXPORT_FORMATS:
+        parser.error(f"--output must end in one of: {', '.join(EXPORT_FORMATS)}")
+    # checked before solving, the export comes after the whole solve
+    if args.output and os.path.splitext(args.output)[1].lower() == ".parquet" and parquet_engine() is None:
+        parser.error("--output .parquet needs pyarrow (pip install -r requirements.txt) or fastparquet")
+
+    time_limit = args.time_limit
+    if args.until_deadline:
+        budget = deadline_budget(args.deadline_margin)
+        if budget is not None:
+            time_limit = budget if time_limit is None else min(time_limit, budget)
+            print(f"Time budget from next deadline: {round(time_limit)} s")
+
+    if args.stream and args.backend != "cp-sat":
+        print("--stream is only supported by the cp-sat backend, ignoring it")
+
+    TELEMETRY.enabled = args.telemetry is not None
+    run_engine(time_limit, args.stream, args.backend, not args.no_cache, args.output)
+
+    if args.telemetry:
+        os.makedirs(args.telemetry, exist_ok=True)
+        labels = {"season": SEASON, "gw": CURRENT_GW}
+        TELEMETRY.write_json(os.path.join(args.telemetry, "telemetry.json"), labels)
+        TELEMETRY.write_prometheus(os.path.join(args.telemetry, "telemetry.prom"), labels)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,71 @@
+import numpy as np
+
+"""
+Fixture index of a season: dense teams x GWs x fixture slot arrays of the opponent, home / away and the
+difficulty of every fixture, plus the number of fixtures per team and GW (0 in a blank GW, 2 or more in a
+double). Slots past a cell's fixture count are padding (opponent 0, difficulty 0, away).
+"""
+
+
+class FixtureIndex:
+    # array attributes, as saved in the Dataloader snapshot
+    COLUMNS = ["teams", "opponent", "home", "difficulty", "count"]
+
+    def __init__(self, teams, opponent, home, difficulty, count, gws):
+        self.teams = np.asarray(teams, dtype=np.int64)
+        self.opponent = np.asarray(opponent, dtype=np.int16)
+        self.home = np.asarray(home, dtype=bool)
+        self.difficulty = np.asarray(difficulty, dtype=np.int8)
+        self.count = np.asarray(count, dtype=np.int8)
+        self.first_gw = gws[0]
+
+        self.row = {team: i for i, team in enumerate(self.teams.tolist())}
+
+    @property
+    def max_fixtures(self):
+        return self.opponent.shape[2]
+
+    def rows(self, team_ids):
+        return np.fromiter((self.row[team] for team in team_ids), dtype=np.int64, count=len(team_ids))
+
+
+def build_fixture_index(fixtures, team_ids, gws):
+    """
+    Build the index over `gws` from a fixtures.csv frame (event, kickoff_time, team_h, team_a,
+    team_h_difficulty, team_a_difficulty). Fixtures without a GW yet (postponed) are left out, double GW
+    fixtures are slotted in kickoff order.
+    """
+    import pandas as pd
+
+    fixtures = fixtures[fixtures["event"].isin(list(gws))].sort_values(["event", "kickoff_time"], kind="stable").reset_index(drop=True)
+
+    # every fixture once from each side, with the difficulty that side faces
+    sides = pd.concat(
+        [
+            pd.DataFrame({"team": fixtures["team_h"], "event": fixtures["event"], "opponent": fixtures["team_a"], "home": True, "difficulty": fixtures["team_h_difficulty"]}),
+            pd.DataFrame({"team": fixtures["team_a"], "event": fixtures["event"], "opponent": fixtures["team_h"], "home": False, "difficulty": fixtures["team_a_difficulty"]}),
+        ]
+    ).sort_index(kind="stable")  # back in kickoff order
+    slot = sides.groupby(["team", "event"]).cumcount().to_numpy()
+
+    teams = np.asarray(team_ids, dtype=np.int64)
+    row = {t: i for i, t in enumerate(teams.tolist())}
+    team_row = np.fromiter((row[t] for t in sides["team"]), dtype=np.int64, count=len(sides))
+    col = sides["event"].to_numpy(dtype=np.int64) - gws[0]
+
+    count = np.zeros((len(teams), len(gws)), dtype=np.int8)
+    np.add.at(count, (team_row, col), 1)
+    shape = (len(teams), len(gws), max(int(count.max(initial=0)), 1))
+
+    index = FixtureIndex(
+        teams=teams,
+        opponent=np.zeros(shape, dtype=np.int16),
+        home=np.zeros(shape, dtype=bool),
+        difficulty=np.zeros(shape, dtype=np.int8),
+        count=count,
+        gws=gws,
+    )
+    index.opponent[team_row, col, slot] = sides["opponent"].to_numpy()
+    index.home[team_row, col, slot] = sides["home"].to_numpy()
+    index.difficulty[team_row, col, slot] = sides["difficulty"].to_numpy()
+    return index
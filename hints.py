@@ -0,0 +1,64 @@
+import json
+import os
+
+"""
+Persist each run's squads so the next run (usually the following GW) can hand them to CP-SAT as a
+solution hint. Hints are stored by player id, so they survive players being added to or dropped from the pool.
+"""
+
+HINT_DIR = ".cache/hints"
+
+
+def hint_path(season, gw):
+    return os.path.join(HINT_DIR, season, f"gw{gw}.json")
+
+
+def save_hints(result, season, gw):
+    os.makedirs(os.path.join(HINT_DIR, season), exist_ok=True)
+    with open(hint_path(season, gw), "w") as f:
+        json.dump({"season": season, "gw": gw, "gws": result["gws"]}, f)
+
+
+def load_hints(season, gw, gws):
+    """
+    Load the most recent saved run of `season` at or before `gw` and pick a hint for every GW in `gws`: the
+    stored squad for the same GW, or the latest stored GW before it. Returns {} when nothing is stored.
+    """
+    season_dir = os.path.join(HINT_DIR, season)
+    if not os.path.isdir(season_dir):
+        return {}
+
+    runs = [int(f[2:-5]) for f in os.listdir(season_dir) if f.startswith("gw") and f.endswith(".json")]
+    runs = [r for r in runs if r <= gw]
+    if not runs:
+        return {}
+
+    with open(hint_path(season, max(runs))) as f:
+        stored = {int(t): picks for t, picks in json.load(f)["gws"].items()}
+
+    hints = {}
+    for t in gws:
+        earlier = [s for s in stored if s <= t]
+        if earlier:
+            hints[t] = stored[max(earlier)]
+    return hints
+
+
+def add_hints(model, var, pids, t, hint):
+    """
+    Hint every x/y of GW t from a stored squad, remapped onto the current pool by player id. Returns how many
+    hinted squad players are missing from the pool.
+    """
+    x, y = var
+    squad, xi = set(hint["squad"]), set(hint["xi"])
+    for pid in pids:
+        model.add_hint(x[(pid, t)], pid in squad)
+        model.add_hint(y[(pid, t)], pid in xi)
+
+    return len(squad - set(pids))
+
+
+def hint_stats(hint, picks, missing):
+    # squad players hinted / kept in the solution / no longer in the pool
+    kept = len(set(hint["squad"]) & set(picks["squad"])) if picks else 0
+    return {"hinted": len(hint["squad"]), "kept": kept, "missing": missing}
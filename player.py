@@ -1,117 +1,211 @@
+import numpy as np
+
+
+class PlayerStore:
+    """
+    Struct-of-arrays player table. Time independent data is one array per attribute indexed by player row,
+    time dependent data is a players x GWs matrix (column t - first_gw). Fixture data has a third axis, one
+    slot per fixture of the GW (see fixtures.FixtureIndex), with `fixture_count` of them in use.
+    """
+
+    # array attributes, in the order __init__ takes them
+    COLUMNS = ["ids", "price", "name", "team_name", "team_code", "team_id", "position", "chance_of_playing", "fixture_count", "vs_team_id", "vs_team_diff", "home", "xp"]
+
+    def __init__(self, ids, price, name, team_name, team_code, team_id, position, chance_of_playing, gws, fixture_count, vs_team_id, vs_team_diff, home, xp):
+        # Time independent data
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.price = np.asarray(price, dtype=np.int64)
+        self.name = np.asarray(name, dtype=object)
+        self.team_name = np.asarray(team_name, dtype=object)
+        self.team_code = np.asarray(team_code, dtype=np.int64)
+        self.team_id = np.asarray(team_id, dtype=np.int64)
+        self.position = np.asarray(position, dtype=np.int8)
+        self.chance_of_playing = np.asarray(chance_of_playing, dtype=np.float64)  # NaN when not flagged
+
+        # Time dependent data
+        self.first_gw = gws[0]
+        self.fixture_count = np.asarray(fixture_count, dtype=np.int8)
+        self.vs_team_id = np.asarray(vs_team_id, dtype=np.int16)
+        self.vs_team_diff = np.asarray(vs_team_diff, dtype=np.int8)
+        self.home = np.asarray(home, dtype=bool)
+        self.xp = np.asarray(xp, dtype=np.float64)
+
+        self.row = {pid: i for i, pid in enumerate(self.ids.tolist())}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def col(self, t):
+        return t - self.first_gw
+
+    def players(self):
+        """
+        Player views over every row, keyed by player id.
+        """
+        return {pid: Player(self, i) for pid, i in self.row.items()}
+
+    def take(self, rows, ids=None):
+        """
+        New store holding `rows` of this one, optionally under new player ids.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = {name: getattr(self, name)[rows] for name in self.COLUMNS}
+        if ids is not None:
+            columns["ids"] = ids
+        return PlayerStore(**columns, gws=[self.first_gw])
+
+
+def store_rows(players):
+    """
+    The store behind a dict of Player views and their rows in it, in dict order.
+    """
+    views = list(players.values())
+    store = views[0].store if views else None
+    if any(p.store is not store for p in views):
+        raise ValueError("Players come from more than one PlayerStore")
+    return store, np.fromiter((p.row for p in views), dtype=np.int64, count=len(views))
+
+
+class ByGameweek:
+    """
+    A player's row of a players x GWs matrix, indexed by GW.
+    """
+
+    __slots__ = ("_values", "_first_gw")
+
+    def __init__(self, values, first_gw):
+        self._values = values
+        self._first_gw = first_gw
+
+    def __getitem__(self, t):
+        return self._values[t - self._first_gw].item()
+
+    def __setitem__(self, t, value):
+        self._values[t - self._first_gw] = value
+
+
+class FixturesByGameweek:
+    """
+    A player's row of a players x GWs x fixtures array, indexed by GW: the list of that GW's fixtures (empty
+    in a blank GW).
+    """
+
+    __slots__ = ("_values", "_count", "_first_gw")
+
+    def __init__(self, values, count, first_gw):
+        self._values = values
+        self._count = count
+        self._first_gw = first_gw
+
+    def __getitem__(self, t):
+        col = t - self._first_gw
+        return self._values[col, : self._count[col]].tolist()
+
+
 class Player:
-    # Time independent data
-    _id: int = None
-    _price: float = None
-    _name: str = None
-    _team_name: str = None
-    _team_code: int = None
-    _team_id: int = None
-    _position: list[1 | 2 | 3 | 4] = None
-    _chance_of_playing: int = None
-
-    # Time dependent data
-    _vs_team_id: dict[int, int] = None
-    _vs_team_diff: dict[int, int] = None
-    _xp: dict[int, int] = None
-
-    def __init__(self, id, price, name, team_name, team_code, team_id, position, chance_of_playing, vs_team_id, vs_team_diff, xp):
-        self._id = id
-        self._price = price
-        self._name = name
-        self._team_name = team_name
-        self._team_code = team_code
-        self._team_id = team_id
-        self._position = position
-        self._chance_of_playing = chance_of_playing
-
-        self._vs_team_id = vs_team_id
-        self._vs_team_diff = vs_team_diff
-        self._xp = xp
+    """
+    View of one row of a PlayerStore. Setters write through to the store.
+    """
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    @property
+    def store(self):
+        return self._store
+
+    @property
+    def row(self):
+        return self._row
 
     @property
     def id(self):
-        return self._id
+        return self._store.ids[self._row].item()
 
     @id.setter
     def id(self, value):
-        self._id = value
+        del self._store.row[self.id]
+        self._store.ids[self._row] = value
+        self._store.row[value] = self._row
 
     @property
     def price(self):
-        return self._price
+        return self._store.price[self._row].item()
 
     @price.setter
     def price(self, value):
-        self._price = value
+        self._store.price[self._row] = value
 
     @property
     def name(self):
-        return self._name
+        return self._store.name[self._row]
 
     @name.setter
     def name(self, value):
-        self._name = value
+        self._store.name[self._row] = value
 
     @property
     def team_name(self):
-        return self._team_name
+        return self._store.team_name[self._row]
 
     @team_name.setter
     def team_name(self, value):
-        self._team_name = value
+        self._store.team_name[self._row] = value
 
     @property
     def team_code(self):
-        return self._team_code
+        return self._store.team_code[self._row].item()
 
     @team_code.setter
     def team_code(self, value):
-        self._team_code = value
+        self._store.team_code[self._row] = value
 
     @property
     def team_id(self):
-        return self._team_id
+        return self._store.team_id[self._row].item()
 
     @team_id.setter
     def team_id(self, value):
-        self._team_id = value
+        self._store.team_id[self._row] = value
 
     @property
     def position(self):
-        return self._position
+        return self._store.position[self._row].item()
 
     @position.setter
     def position(self, value):
-        self._position = value
+        self._store.position[self._row] = value
 
     @property
     def chance_of_playing(self):
-        return self._chance_of_playing
+        return self._store.chance_of_playing[self._row].item()
 
     @chance_of_playing.setter
     def chance_of_playing(self, value):
-        self._chance_of_playing = value
+        self._store.chance_of_playing[self._row] = value
 
     @property
-    def vs_team_id(self):
-        return self._vs_team_id
+    def fixture_count(self):
+        return ByGameweek(self._store.fixture_count[self._row], self._store.first_gw)
 
-    @vs_team_id.setter
-    def vs_team_id(self, value):
-        self._vs_team_id = value
+    @property
+    def vs_team_id(self):
+        return self._fixtures(self._store.vs_team_id)
 
     @property
     def vs_team_diff(self):
-        return self._vs_team_diff
+        return self._fixtures(self._store.vs_team_diff)
 
-    @vs_team_diff.setter
-    def vs_team_diff(self, value):
-        self._vs_team_diff = value
+    @property
+    def home(self):
+        return self._fixtures(self._store.home)
+
+    def _fixtures(self, values):
+        return FixturesByGameweek(values[self._row], self._store.fixture_count[self._row], self._store.first_gw)
 
     @property
     def xp(self):
-        return self._xp
-
-    @xp.setter
-    def xp(self, value):
-        self._xp = value
+        return ByGameweek(self._store.xp[self._row], self._store.first_gw)
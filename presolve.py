@@ -0,0 +1,67 @@
+import numpy as np
+
+"""
+Pre-solve reductions on the player pool. Everything removed here provably can't change the optimum of the
+squad model (apart from unavailable players, which we never want picked), so CP-SAT only sees the
+players that could ever enter an optimal squad.
+"""
+
+
+def reduce_players(players, values, squad_pos, squad_size, max_per_team, equal_price_only):
+    """
+    Remove unavailable and dominated players, returning the kept players and a report of what went.
+
+    `values` maps pid -> objective coefficient for every GW of the horizon. A player q dominates p if they
+    play the same position, q is no more expensive and q is worth at least as much in every GW (ties broken
+    by pool order so identical players don't remove each other). When the model has a minimum spend,
+    swapping in a cheaper player could break it, so `equal_price_only` restricts dominance to equal prices.
+
+    p is removed when, whatever optimal squad contains p, one of its dominators can be swapped in for it:
+      - top-k per position and team: p has at least min(max_per_team, slots) dominators in its own team,
+        so at least one of them is left out of the squad and swapping keeps the team count, or
+      - p has dominators in at least slots + (squad_size - 1) // max_per_team distinct teams, which is more
+        than the teams that can be full or whose dominators are all already in the squad.
+    Each swap moves to a strictly dominating player, so repeating them ends at a squad made only of kept
+    players with an objective no worse than the original.
+    """
+    pids = list(players.keys())
+    available = [pid for pid in pids if players[pid].chance_of_playing != 0]
+    unavailable = len(pids) - len(available)
+
+    max_full_teams = (squad_size - 1) // max_per_team
+    kept = set(available)
+    dominated = 0
+
+    for pos, slots in squad_pos.items():
+        group = [pid for pid in available if players[pid].position == pos]
+        if not group:
+            continue
+
+        price = np.array([players[pid].price for pid in group])
+        team = np.array([players[pid].team_code for pid in group])
+        # identical GWs add nothing to the comparison
+        value = np.unique(np.array([values[pid] for pid in group], dtype=float), axis=1)
+        order = np.arange(len(group))
+
+        for i, pid in enumerate(group):
+            cheaper = price == price[i] if equal_price_only else price <= price[i]
+            better = (value >= value[i]).all(axis=1)
+            identical = (price == price[i]) & (value == value[i]).all(axis=1)
+            dominators = cheaper & better & (~identical | (order < i))
+
+            if not dominators.any():
+                continue
+
+            same_team = np.count_nonzero(dominators & (team == team[i]))
+            teams = len(np.unique(team[dominators]))
+            if same_team >= min(max_per_team, slots) or teams >= slots + max_full_teams:
+                kept.discard(pid)
+                dominated += 1
+
+    report = {
+        "players": len(pids),
+        "kept": len(kept),
+        "unavailable": unavailable,
+        "dominated": dominated,
+    }
+    return {pid: players[pid] for pid in pids if pid in kept}, report
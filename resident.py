@@ -0,0 +1,290 @@
+import threading
+import time
+
+from ortools.sat.python import cp_model
+from dataloader import Dataloader, GWS, SEASON, CURRENT_GW
+from engine import BUDGET, MIN_SPEND, build_index, build_model, group_subproblems, player_values
+from hints import load_hints, add_hints
+
+"""
+Data and compiled models kept in memory across many solves (the HTTP service, batch runs). Requests only
+change bounds, so each one solves a clone of a compiled model with its budget and locked / banned players
+written straight into the clone's proto.
+
+Price and xP changes (from a data refresh, or a what-if through update_prices / update_xp) and standing
+bans / locks are written into the compiled models themselves: the cost row and objective coefficients of
+the changed players, and the domains of their variables. Only changes to the player pool rebuild them.
+What-ifs are kept here, like the bans / locks, and never touch the shared Dataloader: they win over
+refreshed prices / xP and are applied again when the models are rebuilt.
+"""
+
+# Refresh changes that alter the pool or the constraint membership lists, so the models are rebuilt
+REBUILD_CHANGES = ["added", "removed", "chance_of_playing", "position", "team_code"]
+
+
+class ResidentModel:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.locked = set()
+        self.banned = set()
+        # what-if prices / xP, {pid: value}
+        self.prices = {}
+        self.xp = {}
+        self.load()
+
+    def load(self):
+        DL = Dataloader()
+        self.mtime = DL.source_mtime()
+
+        # no dominance pruning, a ban could make a removed player part of the optimum again
+        players = {pid: p for pid, p in DL.players.items() if p.chance_of_playing != 0}
+        self.index = build_index(players)
+
+        # what-ifs of players still in the pool, before the models are compiled from the index
+        self.prices = {pid: price for pid, price in self.prices.items() if pid in players}
+        self.xp = {pid: value for pid, value in self.xp.items() if pid in players}
+        self.index["price"] = [self.price(pid) for pid in self.index["pids"]]
+        if self.xp:
+            self.index["values"] = player_values(players, GWS, self.xp)
+
+        # compile each distinct subproblem once, warm started from the engine's last squads
+        hints = load_hints(SEASON, CURRENT_GW, GWS)
+        self.base = {}
+        self.subproblem_of = {}
+        for gws in group_subproblems(self.index, GWS):
+            model, var = build_model(self.index, gws[:1])
+            if gws[0] in hints:
+                add_hints(model, var, self.index["pids"], gws[0], hints[gws[0]])
+            self.base[gws[0]] = (model, var)
+            for t in gws:
+                self.subproblem_of[t] = gws[0]
+
+        # standing bans / locks of players still in the pool
+        self.locked &= set(self.index["pids"])
+        self.banned &= set(self.index["pids"])
+        self.set_domains(self.locked, 1, 1)
+        self.set_domains(self.banned, 0, 0)
+
+        self.loaded_at = time.time()
+        print(f"Compiled {len(self.base)} subproblems over {len(self.index['pids'])} players")
+
+    def current(self):
+        """
+        The index / models to solve against, reloading first if the source data changed.
+        """
+        with self._lock:
+            DL = Dataloader()
+            if DL.source_mtime() != self.mtime:
+                self.apply_changes(DL.refresh())
+                self.mtime = DL.source_mtime()
+            return self.index, self.base, self.subproblem_of
+
+    def apply_changes(self, changes):
+        """
+        Bring the models up to date with a Dataloader.refresh change set.
+        """
+        if changes["reloaded"] or any(changes[key] for key in REBUILD_CHANGES):
+            self.load()
+            return
+
+        pids = set(self.index["pids"])
+        self.write_prices([pid for pid in changes["price"] if pid in pids])
+        self.write_values([pid for pid in changes["xp"] if pid in pids])
+
+    def update_prices(self, prices):
+        """
+        What-if: set the price (tenths of a million) of players, {pid: price}.
+        """
+        with self._lock:
+            self.check_pids(prices)
+            self.prices.update(prices)
+            self.write_prices(list(prices))
+
+    def update_xp(self, xp):
+        """
+        What-if: set the expected points per fixture of players in every GW, {pid: xp}.
+        """
+        with self._lock:
+            self.check_pids(xp)
+            self.xp.update(xp)
+            self.write_values(list(xp))
+
+    def lock(self, pids):
+        with self._lock:
+            self.check_pids(pids)
+            self.locked |= set(pids)
+            self.banned -= set(pids)
+            self.set_domains(pids, 1, 1)
+
+    def ban(self, pids):
+        with self._lock:
+            self.check_pids(pids)
+            self.banned |= set(pids)
+            self.locked -= set(pids)
+            self.set_domains(pids, 0, 0)
+
+    def release(self, pids):
+        """
+        Undo standing bans / locks of players.
+        """
+        with self._lock:
+            self.check_pids(pids)
+            self.locked -= set(pids)
+            self.banned -= set(pids)
+            self.set_domains(pids, 0, 1)
+
+    def price(self, pid):
+        return self.prices.get(pid, self.index["players"][pid].price)
+
+    def check_pids(self, pids):
+        unknown = set(pids) - set(self.index["pids"])
+        if unknown:
+            raise ValueError(f"Players {sorted(unknown)} are unknown or unavailable")
+
+    def set_domains(self, pids, lo, hi):
+        for t, (model, var) in self.base.items():
+            x, _ = var
+            for pid in pids:
+                model.model.proto.variables[x[(pid, t)].index].domain[:] = [lo, hi]
+
+    def write_prices(self, pids):
+        """
+        Copy the current prices of `pids` (what-if or player data) into the index and the cost row of every
+        compiled subproblem.
+        """
+        if not pids:
+            return
+
+        position = {pid: i for i, pid in enumerate(self.index["pids"])}
+        for pid in pids:
+            self.index["price"][position[pid]] = self.price(pid)
+
+        for t, (model, var) in self.base.items():
+            x, _ = var
+            linear = model.model.proto.constraints[model.rows[("cost", t)].index].linear
+            slot = {v: i for i, v in enumerate(linear.vars)}
+            for pid in pids:
+                linear.coeffs[slot[x[(pid, t)].index]] = self.index["price"][position[pid]]
+
+    def write_values(self, pids):
+        """
+        Recompute the objective coefficients of `pids` from the player data and the what-if xP and write them
+        into every compiled subproblem. If that splits GWs that shared a subproblem, the models are rebuilt instead.
+        """
+        if not pids:
+            return
+
+        position = {pid: i for i, pid in enumerate(self.index["pids"])}
+        rows = [position[pid] for pid in pids]
+        self.index["values"][rows] = player_values({pid: self.index["players"][pid] for pid in pids}, GWS, self.xp)
+
+        groups = group_subproblems(self.index, GWS)
+        if sorted(g[0] for g in groups) != sorted(self.base) or any(self.subproblem_of[t] != g[0] for g in groups for t in g):
+            self.load()
+            return
+
+        for t, (model, var) in self.base.items():
+            _, y = var
+            objective = float_objective(model.model.proto)
+            slot = {v: i for i, v in enumerate(objective.vars)}
+            col = GWS.index(t)
+            for pid, row in zip(pids, rows):
+                v, coeff = y[(pid, t)].index, float(self.index["values"][row, col])
+                # CP-SAT leaves zero coefficients out of the objective
+                if v in slot:
+                    objective.coeffs[slot[v]] = coeff
+                else:
+                    objective.vars.append(v)
+                    objective.coeffs.append(coeff)
+
+    def solve(self, request, num_workers=0):
+        """
+        Solve one request: {"budget", "min_spend", "gws", "locked", "banned", "time_limit", "hint"}, all optional.
+        `hint` is a squad (player ids) to warm start from instead of the compiled model's own hint.
+        """
+        index, base, subproblem_of = self.current()
+
+        gws = request.get("gws", list(GWS))
+        budget = request.get("budget", BUDGET)
+        min_spend = min(request.get("min_spend", MIN_SPEND), budget)
+        locked, banned = set(request.get("locked", [])), set(request.get("banned", []))
+        time_limit = request.get("time_limit")
+        hint = request.get("hint")
+
+        unknown_gws = [t for t in gws if t not in subproblem_of]
+        if unknown_gws:
+            raise ValueError(f"GWs {unknown_gws} are outside the horizon {GWS.start}-{GWS.stop - 1}")
+        unknown_pids = (locked | banned) - set(index["pids"])
+        if unknown_pids:
+            raise ValueError(f"Players {sorted(unknown_pids)} are unknown or unavailable")
+
+        start = time.perf_counter()
+        solved = {}
+        result = {"status": cp_model.OPTIMAL, "objective": 0, "gws": {}}
+        for t in gws:
+            s = subproblem_of[t]
+            if s not in solved:
+                solved[s] = self.solve_subproblem(index, base[s], s, budget, min_spend, locked, banned, time_limit, hint, num_workers)
+
+            status, objective, picks = solved[s]
+            if status != cp_model.OPTIMAL:
+                result["status"] = status
+            result["objective"] += objective
+            if picks:
+                result["gws"][t] = picks
+
+        result["status"] = cp_model.cp_model_pb2.CpSolverStatus.Name(result["status"])
+        result["solve_time"] = time.perf_counter() - start
+        return result
+
+    def solve_subproblem(self, index, base, t, budget, min_spend, locked, banned, time_limit, hint, num_workers):
+        """
+        Solve a copy of a compiled subproblem with the request's budget and locked / banned players applied
+        directly to the copied proto.
+        """
+        model, var = base
+        x, y = var
+        with self._lock:
+            request_model = model.model.clone()
+        proto = request_model.proto
+
+        proto.constraints[model.rows[("cost", t)].index].linear.domain[:] = [min_spend, budget]
+        for pid in locked:
+            proto.variables[x[(pid, t)].index].domain[:] = [1, 1]
+        for pid in banned:
+            proto.variables[x[(pid, t)].index].domain[:] = [0, 0]
+
+        if hint is not None:
+            request_model.clear_hints()
+            proto.solution_hint.vars.extend([x[(pid, t)].index for pid in index["pids"]])
+            proto.solution_hint.values.extend([int(pid in hint) for pid in index["pids"]])
+
+        solver = cp_model.CpSolver()
+        solver.parameters.num_workers = num_workers
+        if time_limit is not None:
+            solver.parameters.max_time_in_seconds = time_limit
+        status = solver.solve(request_model)
+
+        if status != cp_model.OPTIMAL and status != cp_model.FEASIBLE:
+            return status, 0, None
+
+        squad = [pid for pid in index["pids"] if solver.boolean_value(x[(pid, t)])]
+        xi = [pid for pid in squad if solver.boolean_value(y[(pid, t)])]
+        return status, solver.objective_value, {"squad": squad, "xi": xi}
+
+
+def float_objective(proto):
+    """
+    The floating point objective of a model proto, moving an integer one (which CP-SAT writes when every
+    coefficient is integral) over first so coefficients can be set to any value.
+    """
+    if proto.HasField("objective"):
+        objective = proto.objective
+        scale = objective.scaling_factor or 1
+        floating = proto.floating_point_objective
+        floating.vars.extend(objective.vars)
+        floating.coeffs.extend(c * scale for c in objective.coeffs)
+        floating.offset = objective.offset * scale
+        floating.maximize = scale < 0
+        proto.ClearField("objective")
+    return proto.floating_point_objective
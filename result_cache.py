@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import time
+
+"""
+On-disk cache of solve results, addressed by a hash of everything the model is built from: the player table
+(after presolve), the horizon, the squad rules and the solver settings. Several jobs firing after one scrape
+all build the same model, so only the first one solves it.
+"""
+
+CACHE_DIR = ".cache/results"
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+MAX_CACHE_AGE = 7 * 24 * 60 * 60
+# temporary files of a writer that crashed before renaming them are swept after this long
+MAX_TMP_AGE = 60 * 60
+
+
+def cache_key(index, gws, values, params):
+    """
+    `values` maps pid -> objective coefficient per GW of `gws`, `params` holds the squad rules and solver
+    settings. Floats are rounded so the key doesn't depend on how a coefficient was computed.
+    """
+    players = index["players"]
+    table = [
+        [int(pid), int(players[pid].price), int(players[pid].position), int(players[pid].team_code), [round(float(v), 6) for v in values[pid]]]
+        for pid in sorted(index["pids"])
+    ]
+    inputs = {"players": table, "gws": list(gws), "params": params}
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def cache_path(key):
+    return os.path.join(CACHE_DIR, key + ".json")
+
+
+def load_result(key):
+    path = cache_path(key)
+    # another job may evict the entry at any point
+    try:
+        with open(path) as f:
+            result = json.load(f)
+    except FileNotFoundError:
+        return None
+    result["gws"] = {int(t): picks for t, picks in result["gws"].items()}
+
+    # mark as recently used for eviction
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return result
+
+
+def store_result(key, result):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    # write then rename, so a concurrent job never reads half a file
+    tmp = cache_path(key) + f".{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(result, f)
+    os.replace(tmp, cache_path(key))
+
+    evict()
+
+
+def evict(max_bytes=MAX_CACHE_BYTES, max_age=MAX_CACHE_AGE):
+    """
+    Drop entries not used for `max_age` seconds, then the least recently used ones until the cache fits in
+    `max_bytes`, and the temporary files left by crashed writers. Other jobs may be evicting at the same time,
+    so files that are already gone are skipped.
+    """
+    now = time.time()
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        try:
+            stat = os.stat(os.path.join(CACHE_DIR, name))
+        except FileNotFoundError:
+            continue
+        if name.endswith(".json"):
+            entries.append((stat.st_mtime, stat.st_size, name))
+        elif name.endswith(".tmp") and now - stat.st_mtime > MAX_TMP_AGE:
+            remove(os.path.join(CACHE_DIR, name))
+
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, name in sorted(entries):
+        if now - mtime > max_age or total > max_bytes:
+            remove(os.path.join(CACHE_DIR, name))
+            total -= size
+
+
+def remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,83 @@
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dataloader import GWS, SEASON
+from resident import ResidentModel
+
+"""
+Long running optimisation service. Keeps the Dataloader and one compiled CP-SAT model per distinct GW
+subproblem resident (see resident.py), and answers solve requests over local HTTP:
+
+    POST /solve   {"budget": 1000, "min_spend": 970, "gws": [6, 7], "locked": [430], "banned": [16], "time_limit": 5}
+    POST /update  {"prices": {"430": 150}, "xp": {"16": 6.5}, "lock": [430], "ban": [16], "release": [82]}
+    GET  /status
+
+Every field of a request is optional, prices are in tenths of a million like players_raw.csv. /update changes
+the resident models for every later solve (what-ifs, standing bans / locks), solve requests' locked / banned
+players only apply to that solve. Changed source files under data/<SEASON>/ are picked up on the next solve.
+"""
+
+HOST = "127.0.0.1"
+PORT = 8650
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/status":
+            return self.respond(404, {"error": f"Unknown path {self.path}"})
+
+        resident = self.server.resident
+        self.respond(200, {"season": SEASON, "gws": list(GWS), "players": len(resident.index["pids"]), "loaded_at": resident.loaded_at})
+
+    def do_POST(self):
+        if self.path not in ("/solve", "/update"):
+            return self.respond(404, {"error": f"Unknown path {self.path}"})
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            result = self.server.resident.solve(request) if self.path == "/solve" else update(self.server.resident, request)
+        except (ValueError, TypeError, AttributeError) as e:
+            return self.respond(400, {"error": str(e)})
+
+        self.respond(200, result)
+
+    def respond(self, code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def update(resident, request):
+    # JSON object keys are strings
+    prices = {int(pid): int(price) for pid, price in request.get("prices", {}).items()}
+    xp = {int(pid): float(value) for pid, value in request.get("xp", {}).items()}
+    # all or nothing
+    resident.check_pids(set(prices) | set(xp) | set(request.get("release", [])) | set(request.get("lock", [])) | set(request.get("ban", [])))
+
+    resident.update_prices(prices)
+    resident.update_xp(xp)
+    resident.release(request.get("release", []))
+    resident.lock(request.get("lock", []))
+    resident.ban(request.get("ban", []))
+    return {"locked": sorted(resident.locked), "banned": sorted(resident.banned)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve squad optimisation requests from resident data and models")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.resident = ResidentModel()
+    print(f"Serving on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
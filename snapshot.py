@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+"""
+Compiled snapshot of the Dataloader: the player store and the team lookups of a season, written as one .npy
+file per column so a later run memory-maps them instead of parsing the CSVs again. A snapshot is stale once
+a source file changes: files whose mtime moved are hashed, and only a changed hash rebuilds it.
+
+Every build is written to a directory of its own and published by atomically replacing the season's
+CURRENT file, which names the build to read, so processes rebuilding the same stale snapshot at once never
+write over each other or over the build another process is reading. Superseded builds are removed once
+they are older than MAX_BUILD_AGE.
+"""
+
+SNAPSHOT_DIR = ".cache/snapshots"
+
+# bump when the snapshot layout or how the lookups are derived changes
+SNAPSHOT_VERSION = 4
+
+CURRENT = "CURRENT"
+
+# seconds a superseded build is kept for the processes still loading it
+MAX_BUILD_AGE = 60 * 60
+
+
+def snapshot_dir(season):
+    return os.path.join(SNAPSHOT_DIR, season)
+
+
+def current_build(season):
+    """
+    Directory of the published build of `season`, or None when there is none yet.
+    """
+    try:
+        with open(os.path.join(snapshot_dir(season), CURRENT)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(snapshot_dir(season), name) if name else None
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def fingerprint(paths):
+    return {path: {"mtime": os.path.getmtime(path), "sha256": file_hash(path)} for path in paths}
+
+
+def is_current(meta, paths, params):
+    """
+    Whether the snapshot was built from the current contents of `paths` with the same `params`, and whether
+    any of them was touched without changing (their stored mtimes are refreshed in `meta`).
+    """
+    if meta.get("version") != SNAPSHOT_VERSION or meta.get("params") != params or sorted(meta["sources"]) != sorted(paths):
+        return False, False
+
+    touched = False
+    for path in paths:
+        source = meta["sources"][path]
+        mtime = os.path.getmtime(path)
+        if mtime == source["mtime"]:
+            continue
+        if file_hash(path) != source["sha256"]:
+            return False, False
+        source["mtime"] = mtime
+        touched = True
+
+    return True, touched
+
+
+def load_snapshot(season, paths, params):
+    """
+    The columns (memory-mapped copy-on-write, so edits stay in this process) and the lookups saved with the
+    snapshot of `season`, or (None, None) when there is none or it is stale. `params` is everything else the
+    snapshot depends on (e.g. the horizon).
+    """
+    directory = current_build(season)
+    if directory is None:
+        return None, None
+    meta_path = os.path.join(directory, "meta.json")
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None, None
+
+    current, touched = is_current(meta, paths, params)
+    if not current:
+        return None, None
+    if touched:
+        write_meta(meta_path, meta)
+
+    columns = {}
+    for name in meta["columns"]:
+        column = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="c")
+        columns[name] = column.astype(object) if name in meta["strings"] else column
+    return columns, meta["lookups"]
+
+
+def write_snapshot(season, paths, params, columns, lookups):
+    """
+    Write a snapshot of `season` from the named array `columns` and the JSON-able `lookups`. Written to a
+    build directory of its own and published by replacing CURRENT, so readers never see half a snapshot.
+    """
+    build = f"build-{time.time_ns()}-{os.getpid()}"
+    tmp = os.path.join(snapshot_dir(season), build + ".tmp")
+    os.makedirs(tmp, exist_ok=True)
+
+    # object (string) columns can't be memory-mapped, they are saved as fixed width unicode
+    strings = [name for name, column in columns.items() if column.dtype == object]
+    for name, column in columns.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), column.astype(str) if name in strings else column)
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "params": params,
+        "sources": fingerprint(paths),
+        "columns": list(columns),
+        "strings": strings,
+        "lookups": lookups,
+    }
+    write_meta(os.path.join(tmp, "meta.json"), meta)
+
+    os.replace(tmp, os.path.join(snapshot_dir(season), build))
+    pointer = os.path.join(snapshot_dir(season), CURRENT)
+    with open(f"{pointer}.{os.getpid()}.tmp", "w") as f:
+        f.write(build)
+    os.replace(f"{pointer}.{os.getpid()}.tmp", pointer)
+    sweep_builds(season)
+
+
+def sweep_builds(season):
+    """
+    Remove the builds (and leftovers of interrupted ones, or of the old single directory layout) that aren't
+    current and are older than MAX_BUILD_AGE. Another process may sweep the same entries at the same time.
+    """
+    directory = snapshot_dir(season)
+    current = current_build(season)
+    now = time.time()
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name == CURRENT or path == current:
+            continue
+        try:
+            if now - os.path.getmtime(path) <= MAX_BUILD_AGE:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def write_meta(path, meta):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, path)
@@ -0,0 +1,70 @@
+import importlib.util
+import json
+import os
+
+"""
+Machine readable result of a run: the squad and XI picked for every gameweek with their cost, the money left
+in the bank and the expected points of the XI. Prices are in tenths of a million like players_raw.csv.
+Exported as JSON (one object per GW), or as CSV / Parquet with one row per picked player per GW.
+"""
+
+EXPORT_FORMATS = [".json", ".csv", ".parquet"]
+
+# engines pandas can write Parquet with, in the order it tries them
+PARQUET_ENGINES = ["pyarrow", "fastparquet"]
+
+
+def parquet_engine():
+    """
+    The first Parquet engine that is installed, or None. Looked up without importing it, so callers can check
+    before a long solve whose result would otherwise be lost.
+    """
+    return next((engine for engine in PARQUET_ENGINES if importlib.util.find_spec(engine) is not None), None)
+
+
+class SolveResult:
+    def __init__(self, status, objective, relaxation, gameweeks):
+        """
+        `gameweeks` is a list of {"gw", "cost", "bank", "objective", "xi": [pids], "squad": [player rows]},
+        a player row being {"id", "name", "team", "position", "price", "vs", "value"}.
+        """
+        self.status = status
+        self.objective = objective
+        self.relaxation = relaxation
+        self.gameweeks = gameweeks
+
+    def gameweek(self, t):
+        return next((gw for gw in self.gameweeks if gw["gw"] == t), None)
+
+    def to_dict(self):
+        return {"status": self.status, "objective": self.objective, "relaxation": self.relaxation, "gameweeks": self.gameweeks}
+
+    def rows(self):
+        rows = []
+        for gw in self.gameweeks:
+            xi = set(gw["xi"])
+            for p in gw["squad"]:
+                rows.append({"gw": gw["gw"], **p, "xi": p["id"] in xi})
+        return rows
+
+    def to_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame(self.rows(), columns=["gw", "id", "name", "team", "position", "price", "vs", "value", "xi"])
+
+    def to_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def to_csv(self, path):
+        self.to_frame().to_csv(path, index=False)
+
+    def to_parquet(self, path):
+        # pandas needs pyarrow or fastparquet for this, check parquet_engine() before solving
+        self.to_frame().to_parquet(path, index=False)
+
+    def export(self, path):
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in EXPORT_FORMATS:
+            raise ValueError(f"Can't export to '{path}', use one of: {', '.join(EXPORT_FORMATS)}")
+        getattr(self, "to_" + ext[1:])(path)
@@ -0,0 +1,65 @@
+import json
+import threading
+import time
+
+from ortools.sat.python import cp_model
+
+"""
+Anytime solving: stream every improving squad CP-SAT finds instead of waiting for the proof of optimality.
+"""
+
+
+class SolutionStream:
+    """
+    Where improving solutions go: human readable lines on stdout, or one JSON object per line in a file.
+    Shared by every subproblem solving on the pool, so writes are serialised.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        self._file = open(path, "a") if path else None
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def emit(self, record):
+        record["elapsed"] = round(time.perf_counter() - self._start, 3)
+        with self._lock:
+            if self._file:
+                self._file.write(json.dumps(record) + "\n")
+                self._file.flush()
+            else:
+                gws = ",".join(str(t) for t in record["gws"])
+                print(f"[{record['elapsed']:.2f}s] GW {gws}: objective {record['objective']:.1f} (bound {record['bound']:.1f})", flush=True)
+                for t, picks in record["picks"].items():
+                    print(f"    GW {t} squad {picks['squad']}", flush=True)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+class SquadStreamer(cp_model.CpSolverSolutionCallback):
+    """
+    Solution callback pushing each improving squad of a solve to a SolutionStream.
+    """
+
+    def __init__(self, stream, var, pids, gws):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self._stream = stream
+        self._x, self._y = var
+        self._pids = pids
+        self._gws = list(gws)
+        self._best = None
+
+    def on_solution_callback(self):
+        objective = self.objective_value
+        if self._best is not None and objective <= self._best:
+            return
+        self._best = objective
+
+        picks = {}
+        for t in self._gws:
+            squad = [pid for pid in self._pids if self.boolean_value(self._x[(pid, t)])]
+            picks[t] = {"squad": squad, "xi": [pid for pid in squad if self.boolean_value(self._y[(pid, t)])]}
+
+        self._stream.emit({"gws": self._gws, "objective": objective, "bound": self.best_objective_bound, "picks": picks})
@@ -0,0 +1,132 @@
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+"""
+Pipeline and solver telemetry. Phases (CSV load, lookups, model build, solve, ...) are timed wherever they
+run and summed per name, phases may nest. Every solve adds a record with its model size and solver
+statistics. A run's telemetry is exported as JSON and as a Prometheus text-format file.
+"""
+
+METRIC_PREFIX = "fpl"
+
+# CP-SAT log lines the solver statistics are read from
+VARIABLES_LINE = re.compile(r"^#Variables: ([\d']+)")
+CONSTRAINTS_LINE = re.compile(r"^#k\w+: ([\d']+)")
+RULE_LINE = re.compile(r"rule '.*' was applied ([\d']+) time")
+WORKERS_LINE = re.compile(r"with (\d+) workers")
+PROGRESS_LINE = re.compile(r"^#(\d+|Bound)\s+([\d.]+)s best:(\S+)\s+next:\[([^,\]]*),?([^\]]*)\]")
+
+
+class Telemetry:
+    def __init__(self):
+        self.enabled = False
+        self.phases = {}
+        self.solves = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0) + elapsed
+
+    def record_solve(self, record):
+        with self._lock:
+            self.solves.append(record)
+
+    def report(self, labels=None):
+        return {
+            "labels": labels or {},
+            "wall_time": time.perf_counter() - self._start,
+            "phases": self.phases,
+            "solves": self.solves,
+        }
+
+    def write_json(self, path, labels=None):
+        with open(path, "w") as f:
+            json.dump(self.report(labels), f, indent=2)
+
+    def write_prometheus(self, path, labels=None):
+        report = self.report(labels)
+        labels = report["labels"]
+        lines = []
+
+        def metric(name, help, samples):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+            for sample_labels, value in samples:
+                all_labels = ",".join(f'{k}="{v}"' for k, v in {**labels, **sample_labels}.items())
+                lines.append(f"{METRIC_PREFIX}_{name}{{{all_labels}}} {value}")
+
+        metric("run_wall_seconds", "Wall time of the whole run", [({}, report["wall_time"])])
+        metric("phase_seconds", "Wall time spent in each phase, summed over threads", [({"phase": p}, s) for p, s in report["phases"].items()])
+
+        solve_metrics = {
+            "wall_time": ("solve_wall_seconds", "Solver wall time"),
+            "objective": ("solve_objective", "Objective of the best solution"),
+            "bound": ("solve_bound", "Best objective bound"),
+            "variables": ("solve_variables", "Variables in the model"),
+            "constraints": ("solve_constraints", "Constraints in the model"),
+            "presolved_variables": ("solve_presolved_variables", "Variables left after presolve"),
+            "presolved_constraints": ("solve_presolved_constraints", "Constraints left after presolve"),
+            "presolve_rules": ("solve_presolve_rules", "Presolve rule applications"),
+            "workers": ("solve_workers", "Solver workers"),
+            "conflicts": ("solve_conflicts", "Conflicts"),
+            "branches": ("solve_branches", "Branches"),
+            "solutions": ("solve_solutions", "Improving solutions found"),
+        }
+        for key, (name, help) in solve_metrics.items():
+            samples = [({"gws": ",".join(map(str, s["gws"])), "backend": s["backend"]}, s[key]) for s in report["solves"] if s.get(key) is not None]
+            if samples:
+                metric(name, help, samples)
+
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def parse_cpsat_log(lines):
+    """
+    Pull presolve reductions, worker count and the objective / bound progress out of a CP-SAT search log.
+    `lines` are the log callback's messages, one of which can hold several lines.
+    """
+    def number(s):
+        return int(s.replace("'", ""))
+
+    stats = {"workers": None, "presolve_rules": 0, "progress": []}
+    sizes = []  # (variables, constraints) of the initial and the presolved model
+    for line in (line for message in lines for line in message.splitlines()):
+        if match := VARIABLES_LINE.match(line):
+            sizes.append([number(match.group(1)), 0])
+        elif (match := CONSTRAINTS_LINE.match(line)) and sizes:
+            sizes[-1][1] += number(match.group(1))
+        elif match := RULE_LINE.search(line):
+            stats["presolve_rules"] += number(match.group(1))
+        elif match := WORKERS_LINE.search(line):
+            stats["workers"] = int(match.group(1))
+        elif match := PROGRESS_LINE.match(line):
+            event, elapsed, best, _, bound = match.groups()
+            stats["progress"].append(
+                {
+                    "time": float(elapsed),
+                    "event": "bound" if event == "Bound" else "solution",
+                    "best": None if best == "-inf" else float(best),
+                    "bound": float(bound) if bound else None,
+                }
+            )
+
+    # the first size printed is the model as built, the last one what presolve left of it
+    if len(sizes) >= 2:
+        stats["presolved_variables"], stats["presolved_constraints"] = sizes[-1]
+    stats["solutions"] = sum(1 for p in stats["progress"] if p["event"] == "solution")
+    return stats
+
+
+TELEMETRY = Telemetry()
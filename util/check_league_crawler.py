@@ -0,0 +1,140 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from league_crawler import TABLES, LeagueCrawler, read_checkpoint, read_table
+from standin_api import StandinAPI
+
+# Runs league_crawler.py against the stand-in API (standin_api.py) in a temporary directory, kills one crawl
+# once it has checkpointed its first managers, leaves behind what a kill between writing a part and
+# checkpointing it would, and checks that the resumed crawl
+#
+#   - doesn't fetch the standings or the checkpointed managers again
+#   - drops the parts the checkpoint doesn't list
+#   - ends with every manager done once and the same tables as an uninterrupted crawl
+#
+#   python util/check_league_crawler.py --managers 3000 --gws 1 2 3
+
+CRAWLER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'league_crawler.py')
+LEAGUE = 314
+
+
+class Check:
+
+    def __init__(self, workdir, url, api, gws, workers):
+        self.workdir = workdir
+        self.url = url
+        self.api = api
+        self.gws = gws
+        self.workers = workers
+        self.failures = []
+
+    def command(self, name):
+        return [sys.executable, CRAWLER, os.path.join(self.workdir, name), '--league', str(LEAGUE), '--managers',
+                str(self.api.managers), '--gws', *map(str, self.gws), '--workers', str(self.workers), '--base-url', self.url]
+
+    def crawl(self, name):
+        self.api.reset_counts()
+        start = time.perf_counter()
+        result = subprocess.run(self.command(name), capture_output=True, text=True)
+        print(f'{name}: exit {result.returncode} in {time.perf_counter() - start:.1f} s, requests {self.api.counts}')
+        return result.returncode
+
+    def crawl_until_checkpoint(self, name):
+        """ Start a crawl and kill it as soon as its checkpoint lists some managers done, returning them
+        """
+        self.api.reset_counts()
+        process = subprocess.Popen(self.command(name), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        while process.poll() is None:
+            checkpoint = read_checkpoint(os.path.join(self.workdir, name))
+            if checkpoint and checkpoint['done']:
+                process.kill()
+                break
+            time.sleep(0.01)
+        process.wait()
+        done = read_checkpoint(os.path.join(self.workdir, name))['done']
+        print(f'{name}: killed with {len(done)} managers done, requests {self.api.counts}')
+        return done
+
+    def check(self, ok, message):
+        print(('ok    ' if ok else 'FAIL  ') + message)
+        if not ok:
+            self.failures.append(message)
+
+    def rows(self, name, table):
+        """ The rows of a table, sorted (parts are written in the order the managers finish)
+        """
+        columns = read_table(os.path.join(self.workdir, name), table)
+        return sorted(zip(*(np.asarray(columns[c]).tolist() for c in TABLES[table])))
+
+    def run(self):
+        self.crawl('whole')
+        entries = [self.api.entry(r) for r in range(1, self.api.managers + 1)]
+        self.check(sorted(read_checkpoint(os.path.join(self.workdir, 'whole'))['done']) == entries,
+                   f'the uninterrupted crawl has all {len(entries)} managers done')
+
+        done = self.crawl_until_checkpoint('resumed')
+        self.check(0 < len(done) < len(entries), 'the crawl was killed halfway')
+
+        # what a kill after writing a part but before checkpointing it leaves
+        crawl_dir = os.path.join(self.workdir, 'resumed')
+        parts = read_checkpoint(crawl_dir)['parts']
+        unlisted = [os.path.join(crawl_dir, 'picks', f"part-{parts['picks']:05d}"),
+                    os.path.join(crawl_dir, 'gw_info', f"part-{parts['gw_info']:05d}.tmp")]
+        for part in unlisted:
+            shutil.rmtree(part, ignore_errors=True)
+            shutil.copytree(os.path.join(crawl_dir, 'picks', 'part-00000'), part)
+        LeagueCrawler(LEAGUE, self.gws, crawl_dir, self.api.managers, self.workers)
+        self.check(not any(os.path.exists(part) for part in unlisted), 'opening the crawl drops the parts its checkpoint doesn\'t list')
+
+        self.crawl('resumed')
+        checkpoint = read_checkpoint(crawl_dir)
+        self.check('leagues-classic' not in self.api.counts, 'the resumed crawl doesn\'t fetch the standings again')
+        requests = sum(self.api.counts.get('entry', {}).values())
+        self.check(requests == (len(entries) - len(done)) * len(self.gws),
+                   f'the resumed crawl only fetches the picks of the {len(entries) - len(done)} managers left ({requests} requests)')
+        self.check(sorted(checkpoint['done']) == entries, 'every manager is done once')
+        self.check(all(sorted(os.listdir(os.path.join(crawl_dir, table))) == [f'part-{n:05d}' for n in range(checkpoint['parts'][table])]
+                       for table in TABLES), 'the crawl dir holds just the parts its checkpoint lists')
+        for table in TABLES:
+            self.check(self.rows('resumed', table) == self.rows('whole', table), f'{table} is the same as the uninterrupted crawl')
+        return not self.failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that league_crawler.py resumes a killed crawl')
+    parser.add_argument('--managers', type=int, default=3000)
+    parser.add_argument('--gws', type=int, nargs='+', default=[1, 2, 3])
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--delay', type=float, default=0.005, help='seconds the stand-in takes per response')
+    parser.add_argument('--season', default='2025-26', help='season whose players are picked')
+    parser.add_argument('--keep', action='store_true', help='keep the temporary directory')
+    args = parser.parse_args()
+
+    api = StandinAPI(args.season, delay=args.delay, managers=args.managers)
+    server = api.serve(0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/api/'
+
+    workdir = tempfile.mkdtemp(prefix='check_league_crawler_')
+    try:
+        ok = Check(workdir, url, api, args.gws, args.workers).run()
+    finally:
+        server.shutdown()
+        if args.keep:
+            print(f'Left the crawls in {workdir}')
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    print('All checks passed' if ok else 'Some checks failed')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
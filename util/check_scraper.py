@@ -0,0 +1,166 @@
+import argparse
+import filecmp
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from standin_api import StandinAPI
+
+# Runs global_scraper.py against the stand-in API (standin_api.py) in a temporary directory and checks that
+#
+#   - the concurrent scrape writes the same files as a sequential one
+#   - a rerun is served from the response cache, and once the TTLs are up revalidated with 304s
+#   - an incremental scrape fetches only the changed players and leaves the same files as a full scrape
+#   - an incremental scrape that fails halfway doesn't move the baseline, so the next one redoes it
+#
+#   python util/check_scraper.py --season 2025-26
+
+SCRAPER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'global_scraper.py')
+MANIFEST = 'scrape_manifest.json'
+# Files that differ between identical runs: the manifest has the time of the scrape, the merge index the
+# mtime of merged_gw.csv (which is compared itself)
+NOT_COMPARED = {MANIFEST, 'merged_gw.index.json'}
+
+
+class Check:
+
+    def __init__(self, season, workdir, url, api):
+        self.season = season
+        self.workdir = workdir
+        self.url = url
+        self.api = api
+        self.failures = []
+
+    def scrape(self, name, *args):
+        """ Run the scraper in <workdir>/<name> (its data/ and .cache/ stay there), returning the exit code
+        """
+        cwd = os.path.join(self.workdir, name)
+        os.makedirs(os.path.join(cwd, 'data', self.season, 'gws'), exist_ok=True)
+        self.api.reset_counts()
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, SCRAPER, '--season', self.season, '--base-url', self.url, *args],
+                                cwd=cwd, capture_output=True, text=True)
+        print(f"{name} {' '.join(args)}: exit {result.returncode} in {time.perf_counter() - start:.1f} s, requests {self.api.counts}")
+        return result.returncode
+
+    def season_dir(self, name):
+        return os.path.join(self.workdir, name, 'data', self.season)
+
+    def manifest(self, name):
+        with open(os.path.join(self.season_dir(name), MANIFEST)) as f:
+            return json.load(f)
+
+    def check(self, ok, message):
+        print(('ok    ' if ok else 'FAIL  ') + message)
+        if not ok:
+            self.failures.append(message)
+
+    def same_files(self, a, b, message):
+        """ Every file under data/<season> of both runs byte for byte the same (bar NOT_COMPARED)
+        """
+        differ = []
+        for root, _, files in os.walk(self.season_dir(a)):
+            for f in files:
+                path = os.path.join(root, f)
+                other = os.path.join(self.season_dir(b), os.path.relpath(path, self.season_dir(a)))
+                if f not in NOT_COMPARED and not (os.path.exists(other) and filecmp.cmp(path, other, shallow=False)):
+                    differ.append(os.path.relpath(path, self.season_dir(a)))
+        count = sum(len(files) for _, _, files in os.walk(self.season_dir(b)))
+        if count != sum(len(files) for _, _, files in os.walk(self.season_dir(a))):
+            differ.append('file count')
+        self.check(not differ, message + (f' ({len(differ)} differ, e.g. {differ[:3]})' if differ else ''))
+
+    def expire_cache(self, name):
+        """ Age every cached response past its TTL, so the next run has to revalidate them
+        """
+        cache_dir = os.path.join(self.workdir, name, '.cache', 'http')
+        for f in os.listdir(cache_dir):
+            if f.endswith('.json'):
+                path = os.path.join(cache_dir, f)
+                with open(path) as fp:
+                    entry = json.load(fp)
+                entry['fetched'] = 0
+                with open(path, 'w') as fp:
+                    json.dump(entry, fp)
+
+    def run(self, workers):
+        players = [pid for pid, p in self.api.players.items() if p['history']]
+        summaries = len(self.api.elements)
+
+        self.scrape('sequential', '--workers', '1', '--no-cache')
+        self.scrape('concurrent', '--workers', str(workers))
+        self.same_files('sequential', 'concurrent', f'{workers} workers write the same files as 1')
+
+        self.scrape('concurrent', '--workers', str(workers))
+        self.check('element-summary' not in self.api.counts and self.api.counts.get('bootstrap-static') == {304: 1},
+                   'a rerun within the TTLs only revalidates bootstrap-static')
+        self.same_files('sequential', 'concurrent', 'the cached rerun writes the same files')
+
+        self.expire_cache('concurrent')
+        self.scrape('concurrent', '--workers', str(workers))
+        self.check(self.api.counts.get('element-summary') == {304: summaries},
+                   f'past the TTLs all {summaries} element-summaries are revalidated with a 304')
+        self.same_files('sequential', 'concurrent', 'the revalidated rerun writes the same files')
+
+        # one player scores, the incremental scrape only fetches that one (within its cache TTL too)
+        changed = players[0]
+        element = next(e for e in self.api.elements if e['id'] == changed)
+        self.api.update_player(changed, total_points=element['total_points'] + 2)
+        self.scrape('concurrent', '--workers', str(workers), '--incremental')
+        self.check(self.manifest('concurrent')['fetched'] == [changed] and self.api.counts.get('element-summary') == {200: 1},
+                   f'the incremental scrape fetches only player {changed}')
+        self.scrape('full', '--workers', str(workers), '--no-cache')
+        self.same_files('full', 'concurrent', 'the incremental scrape writes the same files as a full one')
+
+        # two more score and the second one's summary fails, the baseline has to stay where it was
+        first, second = players[1], players[2]
+        for pid in (first, second):
+            element = next(e for e in self.api.elements if e['id'] == pid)
+            self.api.update_player(pid, total_points=element['total_points'] + 2)
+        baseline = self.manifest('concurrent')['baseline']
+        self.api.failing = {second}
+        code = self.scrape('concurrent', '--workers', str(workers), '--incremental')
+        self.check(code != 0 and self.manifest('concurrent')['baseline'] == baseline,
+                   'a failed incremental scrape leaves the manifest baseline as it was')
+        self.api.failing = set()
+        self.scrape('concurrent', '--workers', str(workers), '--incremental')
+        self.check(sorted(self.manifest('concurrent')['fetched']) == sorted([first, second]),
+                   f'the next incremental scrape fetches players {first} and {second} again')
+        self.scrape('full', '--workers', str(workers), '--no-cache')
+        self.same_files('full', 'concurrent', 'and leaves the same files as a full scrape')
+        return not self.failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check global_scraper.py against the stand-in API')
+    parser.add_argument('--season', default='2025-26')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--delay', type=float, default=0.005, help='seconds the stand-in takes per response')
+    parser.add_argument('--keep', action='store_true', help='keep the temporary directory')
+    args = parser.parse_args()
+
+    api = StandinAPI(args.season, delay=args.delay)
+    server = api.serve(0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/api/'
+
+    workdir = tempfile.mkdtemp(prefix='check_scraper_')
+    try:
+        ok = Check(args.season, workdir, url, api).run(args.workers)
+    finally:
+        server.shutdown()
+        if args.keep:
+            print(f'Left the runs in {workdir}')
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+    print('All checks passed' if ok else 'Some checks failed')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,21 @@
 import os
 import sys
 import csv
+import hashlib
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+# Per-player parsing runs on this many processes (in this one below 2)
+WORKERS = os.cpu_count() or 1
+
+# root directory -> (mtimes of its sources, lookups), see get_lookups
+_lookups = {}
+
+# Sidecar of merged_gw.csv: where each merged GW's block of rows sits in it and the hash of the block
+MERGED_INDEX = "merged_gw.index.json"
+# A row of merged_gw.csv is identified by these
+MERGE_KEY = ['element', 'fixture', 'GW']
 
 def get_teams(directory):
     teams = {}
@@ -44,7 +59,98 @@ def get_expected_points(gw, directory):
         return xPoints    
     return xPoints
 
+def merge_key(row):
+    if all(k in row for k in MERGE_KEY):
+        return tuple(str(row[k]) for k in MERGE_KEY)
+    return tuple(row.items())
+
+def gw_block(gw, fieldnames, rows):
+    """ The rows of one GW as merged_gw.csv bytes, one row per (element, fixture, GW) key (the last one wins)
+    """
+    unique = {}
+    for row in rows:
+        row["GW"] = gw
+        unique[merge_key(row)] = row
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=fieldnames, lineterminator='\n')
+    for row in unique.values():
+        writer.writerow(row)
+    return out.getvalue().encode("utf-8"), len(unique)
+
+def read_merged_index(gw_directory, out_path):
+    """ The sidecar index of merged_gw.csv, rebuilt from the file when there is none or it doesn't describe
+    the file as it is (written by the old appending merge_gw, or by hand). Duplicate rows are dropped then.
+    """
+    index_path = os.path.join(gw_directory, MERGED_INDEX)
+    if not os.path.exists(out_path):
+        return {"header": None, "gws": {}}
+    if os.path.exists(index_path):
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+        if index["size"] == os.path.getsize(out_path) and index["mtime"] == os.path.getmtime(out_path):
+            return index
+
+    print("Rebuilding " + MERGED_INDEX)
+    with open(out_path, 'r', encoding="utf-8") as fin:
+        reader = csv.DictReader(fin)
+        header = reader.fieldnames
+        rows = {}
+        for row in reader:
+            rows.setdefault(int(row["GW"]), []).append(row)
+    blocks = {gw: gw_block(gw, header, gw_rows) + (header,) for gw, gw_rows in rows.items()}
+    index = write_merged(out_path, {}, blocks)
+    write_merged_index(index_path, out_path, index)
+    return index
+
+def write_merged_index(index_path, out_path, index):
+    index["size"] = os.path.getsize(out_path)
+    index["mtime"] = os.path.getmtime(out_path)
+    with open(index_path + '.tmp', 'w') as f:
+        json.dump(index, f)
+    os.replace(index_path + '.tmp', index_path)
+
+def write_merged(out_path, index, blocks):
+    """ Write merged_gw.csv with the blocks of `index` (copied over as bytes) and the new `blocks` (GW ->
+    (bytes, rows, fieldnames)), in GW order under the header of the first GW, to a temporary file renamed over
+    the old one. Returns the new index.
+    """
+    gws = {int(gw): entry for gw, entry in index.get("gws", {}).items()}
+    first = min(set(gws) | set(blocks))
+    header = blocks[first][2] if first in blocks else gws[first]["fieldnames"]
+    old = open(out_path, 'rb') if gws else None
+    tmp = out_path + '.tmp'
+    new_index = {"header": header, "gws": {}}
+    with open(tmp, 'wb') as fout:
+        out = io.StringIO()
+        csv.writer(out, lineterminator='\n').writerow(header)
+        fout.write(out.getvalue().encode("utf-8"))
+        for gw in sorted(set(gws) | set(blocks)):
+            if gw in blocks:
+                data, count, fieldnames = blocks[gw]
+                entry = {"sha256": hashlib.sha256(data).hexdigest(), "rows": count, "fieldnames": fieldnames}
+            else:
+                entry = dict(gws[gw])
+                old.seek(entry["start"])
+                data = old.read(entry["end"] - entry["start"])
+            entry["start"] = fout.tell()
+            fout.write(data)
+            entry["end"] = fout.tell()
+            new_index["gws"][str(gw)] = entry
+    if old:
+        old.close()
+    os.replace(tmp, out_path)
+    return new_index
+
 def merge_gw(gw, gw_directory):
+    """ Upsert one gameweek into merged_gw.csv: its rows replace the ones merged for it before, keyed on
+    (element, fixture, GW), and the file is rewritten in GW order so reruns in any order give the same
+    bytes. Unchanged gameweeks are copied over from the index offsets without parsing, a rerun of an
+    unchanged gameweek doesn't write at all.
+
+    Args:
+        gw (int): gameweek, read from gw<gw>.csv
+        gw_directory (str): gws directory of the season
+    """
     merged_gw_filename = "merged_gw.csv"
     gw_filename = "gw" + str(gw) + ".csv"
     gw_path = os.path.join(gw_directory, gw_filename)
@@ -56,57 +162,119 @@ def merge_gw(gw, gw_directory):
     for row in reader:
         row["GW"] = gw
         rows += [row]
+    fin.close()
     out_path = os.path.join(gw_directory, merged_gw_filename)
-    fout = open(out_path,'a', encoding="utf-8")
-    writer = csv.DictWriter(fout, fieldnames=fieldnames, lineterminator='\n')
     print(gw)
-    if gw == 1:
-        writer.writeheader()
-    for row in rows:
-        writer.writerow(row)
 
-def collect_gw(gw, directory_name, output_dir, root_directory_name="data/2025-26"):
-    rows = []
+    index = read_merged_index(gw_directory, out_path)
+    data, count = gw_block(gw, fieldnames, rows)
+    entry = index["gws"].get(str(gw))
+    if entry is not None and entry["sha256"] == hashlib.sha256(data).hexdigest():
+        return
+    index = write_merged(out_path, index, {gw: (data, count, fieldnames)})
+    write_merged_index(os.path.join(gw_directory, MERGED_INDEX), out_path, index)
+
+def get_lookups(root_directory_name):
+    """ Fixtures, teams, names and positions of a season, read once and reused until one of the source
+    files changes
+
+    Args:
+        root_directory_name (str): season directory with teams.csv, fixtures.csv and players_raw.csv
+    """
+    paths = [os.path.join(root_directory_name, f) for f in ['teams.csv', 'fixtures.csv', 'players_raw.csv']]
+    mtimes = [os.path.getmtime(path) for path in paths]
+    cached = _lookups.get(root_directory_name)
+    if cached is None or cached[0] != mtimes:
+        fixtures_home, fixtures_away = get_fixtures(root_directory_name)
+        teams = get_teams(root_directory_name)
+        names, positions = get_positions(root_directory_name)
+        cached = (mtimes, {'fixtures_home': fixtures_home, 'fixtures_away': fixtures_away, 'teams': teams,
+                           'names': names, 'positions': positions})
+        _lookups[root_directory_name] = cached
+    return cached[1]
+
+def list_gw_files(directory_name):
+    """ Every players/<name>_<id>/gw.csv, in the os.walk order the gw files have always been written in
+    """
+    return [os.path.join(root, fname) for root, dirs, files in os.walk(u"./" + directory_name) for fname in files if fname == 'gw.csv']
+
+def _init_worker(lookups):
+    global _worker_lookups
+    _worker_lookups = lookups
+
+def read_player_gws(fpath, gws, lookups=None):
+    """ Read one player's gw.csv once and route its rows to the requested gameweeks
+
+    Args:
+        fpath (str): players/<name>_<id>/gw.csv
+        gws (set): gameweeks to collect
+        lookups (dict): from get_lookups, the worker's copy when run on the pool
+    Returns:
+        (int, list, dict): the player id, the file's fieldnames and gameweek -> rows with the name, position
+            and team filled in
+    """
+    lookups = lookups or _worker_lookups
+    id = int(os.path.basename(os.path.dirname(fpath)).split('_')[-1])
+    rows = {}
+    with open(fpath, 'r') as fin:
+        reader = csv.DictReader(fin)
+        fieldnames = reader.fieldnames
+        for row in reader:
+            gw = int(row['round'])
+            if gw not in gws:
+                continue
+            fixture = int(row['fixture'])
+            if row['was_home'] == True or row['was_home'] == "True":
+                row['team'] = lookups['teams'][lookups['fixtures_home'][fixture]]
+            else:
+                row['team'] = lookups['teams'][lookups['fixtures_away'][fixture]]
+            row['name'] = lookups['names'][id]
+            row['position'] = lookups['positions'][id]
+            rows.setdefault(gw, []).append(row)
+    return id, fieldnames, rows
+
+def collect_gws(gws, directory_name, output_dir, root_directory_name="data/2025-26", workers=WORKERS):
+    """ Write gw<N>.csv for every requested gameweek from a single pass over the players' gw.csv files
+
+    Args:
+        gws (list): gameweeks to collect
+        directory_name (str): players directory of the season
+        output_dir (str): gws directory, with the xP<N>.csv files
+        root_directory_name (str): season directory
+        workers (int): processes parsing the players' files
+    """
+    gws = set(gws)
+    lookups = get_lookups(root_directory_name)
+    fpaths = list_gw_files(directory_name)
+
+    if workers > 1 and len(fpaths) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(lookups,)) as pool:
+            results = list(pool.map(read_player_gws, fpaths, [gws] * len(fpaths), chunksize=max(1, len(fpaths) // (4 * workers))))
+    else:
+        results = [read_player_gws(fpath, gws, lookups) for fpath in fpaths]
+
     fieldnames = []
-    fixtures_home, fixtures_away = get_fixtures(root_directory_name)
-    teams = get_teams(root_directory_name)
-    names, positions = get_positions(root_directory_name)
-    xPoints = get_expected_points(gw, output_dir)
-    for root, dirs, files in os.walk(u"./" + directory_name):
-        for fname in files:
-            if fname == 'gw.csv':
-                fpath = os.path.join(root, fname)
-                fin = open(fpath, 'r')
-                reader = csv.DictReader(fin)
-                fieldnames = reader.fieldnames
-                for row in reader:
-                    if int(row['round']) == gw:
-                        id = int(os.path.basename(root).split('_')[-1])
-                        name = names[id]
-                        position = positions[id]
-                        fixture = int(row['fixture'])
-                        if row['was_home'] == True or row['was_home'] == "True":
-                            row['team'] = teams[fixtures_home[fixture]]
-                        else:
-                            row['team'] = teams[fixtures_away[fixture]]
-                        row['name'] = name
-                        row['position'] = position
-                        if id in xPoints:
-                            row['xP'] = xPoints[id]
-                        else:
-                            row['xP'] = 0.0
-                        rows += [row]
+    rows = {gw: [] for gw in gws}
+    for id, file_fieldnames, file_rows in results:
+        fieldnames = file_fieldnames
+        for gw, gw_rows in file_rows.items():
+            rows[gw] += [(id, row) for row in gw_rows]
 
     fieldnames = ['name', 'position', 'team', 'xP'] + fieldnames
-    outf = open(os.path.join(output_dir, "gw" + str(gw) + ".csv"), 'w', encoding="utf-8")
-    writer = csv.DictWriter(outf, fieldnames=fieldnames, lineterminator='\n')
-    writer.writeheader()
-    for row in rows:
-        writer.writerow(row)
+    for gw in sorted(gws):
+        xPoints = get_expected_points(gw, output_dir)
+        with open(os.path.join(output_dir, "gw" + str(gw) + ".csv"), 'w', encoding="utf-8") as outf:
+            writer = csv.DictWriter(outf, fieldnames=fieldnames, lineterminator='\n')
+            writer.writeheader()
+            for id, row in rows[gw]:
+                row['xP'] = xPoints.get(id, 0.0)
+                writer.writerow(row)
+
+def collect_gw(gw, directory_name, output_dir, root_directory_name="data/2025-26", workers=1):
+    collect_gws([gw], directory_name, output_dir, root_directory_name, workers)
 
-def collect_all_gws(directory_name, output_dir, root_dir):
-    for i in range(1,17):
-        collect_gw(i, directory_name, output_dir, root_dir)
+def collect_all_gws(directory_name, output_dir, root_dir, gws=range(1, 17), workers=WORKERS):
+    collect_gws(gws, directory_name, output_dir, root_dir, workers)
 
 def merge_all_gws(num_gws, gw_directory):
     for i in range(1, num_gws):
@@ -1,6 +1,22 @@
 from datetime import datetime
-import requests
-import json
+from getters import get_json
+
+
+def get_gameweeks():
+    # through the getters' session, rate limit, cache and BASE_URL (FPL_API_URL), failing instead of retrying
+    return get_json('bootstrap-static/', retry=False)['events']
+
+
+def get_next_deadline():
+    """
+    Get's the next gameweek deadline (UTC), or None once the season's last deadline has passed.
+    """
+
+    now = datetime.utcnow()
+    for gameweek in get_gameweeks():
+        next_deadline_date = datetime.strptime(gameweek['deadline_time'], '%Y-%m-%dT%H:%M:%SZ')
+        if next_deadline_date > now:
+            return next_deadline_date
 
 
 def get_recent_gameweek_id():
@@ -8,13 +24,8 @@ def get_recent_gameweek_id():
     Get's the most recent gameweek's ID.
     """
 
-    data = requests.get('https://fantasy.premierleague.com/api/bootstrap-static/')
-    data = json.loads(data.content)
-
-    gameweeks = data['events']
-    
     now = datetime.utcnow()
-    for gameweek in gameweeks:
+    for gameweek in get_gameweeks():
         next_deadline_date = datetime.strptime(gameweek['deadline_time'], '%Y-%m-%dT%H:%M:%SZ')
         if next_deadline_date > now:
             return gameweek['id'] - 1
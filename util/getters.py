@@ -1,54 +1,155 @@
 import requests
 import json
+import os
+import threading
 import time
 
-def get_data():
-    """ Retrieve the fpl player data from the hard-coded url
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from http_cache import HTTP_CACHE_DIR, ResponseCache
+
+# Root of the FPL API, override with FPL_API_URL (or configure) e.g. to scrape from a local stand-in server
+BASE_URL = os.environ.get('FPL_API_URL', 'https://fantasy.premierleague.com/api/')
+# Kept-alive connections of the shared session, at least as many as the scraper's workers
+POOL_SIZE = 16
+
+_session = None
+_session_lock = threading.Lock()
+# Conditional-request cache of the responses, created on first use (None with caching turned off)
+cache_dir = HTTP_CACHE_DIR
+_cache = None
+
+class RateLimiter:
+    """ Spaces requests at least 1 / rate seconds apart, across all threads (no limit when rate is None)
     """
-    response = requests.get("https://fantasy.premierleague.com/api/bootstrap-static/")
-    if response.status_code != 200:
-        raise Exception("Response was code " + str(response.status_code))
-    responseStr = response.text
-    data = json.loads(responseStr)
-    return data
 
-def get_individual_player_data(player_id):
-    """ Retrieve the player-specific detailed data
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+rate_limiter = RateLimiter()
+
+def configure(base_url=None, rate=None, pool_size=None, cache=None):
+    """ Point the getters at another API root, limit them to `rate` requests per second, resize the
+    connection pool of the shared session and / or move or turn off the response cache
 
     Args:
-        player_id (int): ID of the player whose data is to be retrieved
+        base_url (str): e.g. http://127.0.0.1:8000/api/
+        rate (float): requests per second over all threads
+        pool_size (int): connections kept alive
+        cache (str | bool): directory of the response cache, False to turn it off
+    """
+    global BASE_URL, POOL_SIZE, _session, rate_limiter, cache_dir, _cache
+    if base_url:
+        BASE_URL = base_url if base_url.endswith('/') else base_url + '/'
+    if rate is not None:
+        rate_limiter = RateLimiter(rate)
+    if pool_size and pool_size != POOL_SIZE:
+        POOL_SIZE = pool_size
+        with _session_lock:
+            if _session is not None:
+                _session.close()
+            _session = None
+    if cache is not None:
+        cache_dir = cache or None
+        _cache = None
+
+def get_cache():
+    """ The response cache, or None when it's turned off
+    """
+    global _cache
+    with _session_lock:
+        if _cache is None and cache_dir:
+            _cache = ResponseCache(cache_dir)
+        return _cache
+
+def get_session():
+    """ The keep-alive session shared by every getter and thread, so each request reuses a pooled connection
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+        return _session
+
+def get_json(path, retry=True, missing=False, revalidate=False):
+    """ GET an API path (relative to BASE_URL) on the shared session and decode the JSON body. A cached
+    response is served from disk within its TTL, and revalidated with a conditional request after it.
+
+    Args:
+        path (str): e.g. 'element-summary/1/'
+        retry (bool): retry every 5 seconds while the request fails to connect or is throttled (429)
+        missing (bool): return None on a 404 instead of raising
+        revalidate (bool): ask the API even within the TTL, for a response known to have changed
     """
-    base_url = "https://fantasy.premierleague.com/api/element-summary/"
-    full_url = base_url + str(player_id) + "/"
+    full_url = BASE_URL + path
+    cache = get_cache()
+    entry = cache.get(full_url) if cache else None
+    if entry is not None and not revalidate and cache.is_fresh(entry, path):
+        cache.hit(full_url, path, entry, 'fresh')
+        return json.loads(entry['body'])
+
+    headers = cache.headers(entry) if entry is not None else {}
     response = ''
     while response == '':
+        rate_limiter.wait()
         try:
-            response = requests.get(full_url)
-        except:
+            response = get_session().get(full_url, headers=headers)
+        except requests.exceptions.RequestException:
+            if not retry:
+                raise
             time.sleep(5)
+            continue
+        if response.status_code == 429 and retry:
+            time.sleep(float(response.headers.get('Retry-After', 5)))
+            response = ''
+    if response.status_code == 304 and entry is not None:
+        cache.hit(full_url, path, entry, 'revalidated')
+        return json.loads(entry['body'])
+    if response.status_code == 404 and missing:
+        return None
     if response.status_code != 200:
         raise Exception("Response was code " + str(response.status_code))
+    if cache:
+        cache.store(full_url, path, response)
     data = json.loads(response.text)
     return data
 
+def get_data():
+    """ Retrieve the fpl player data (bootstrap-static)
+    """
+    return get_json("bootstrap-static/", retry=False)
+
+def get_individual_player_data(player_id, revalidate=False):
+    """ Retrieve the player-specific detailed data
+
+    Args:
+        player_id (int): ID of the player whose data is to be retrieved
+        revalidate (bool): ask the API even if a cached response is within its TTL
+    """
+    return get_json("element-summary/" + str(player_id) + "/", revalidate=revalidate)
+
 def get_entry_data(entry_id):
     """ Retrieve the summary/history data for a specific entry/team
 
     Args:
         entry_id (int) : ID of the team whose data is to be retrieved
     """
-    base_url = "https://fantasy.premierleague.com/api/entry/"
-    full_url = base_url + str(entry_id) + "/history/"
-    response = ''
-    while response == '':
-        try:
-            response = requests.get(full_url)
-        except:
-            time.sleep(5)
-    if response.status_code != 200:
-        raise Exception("Response was code " + str(response.status_code))
-    data = json.loads(response.text)
-    return data
+    return get_json("entry/" + str(entry_id) + "/history/")
 
 def get_entry_personal_data(entry_id):
     """ Retrieve the summary/history data for a specific entry/team
@@ -56,74 +157,50 @@ def get_entry_personal_data(entry_id):
     Args:
         entry_id (int) : ID of the team whose data is to be retrieved
     """
-    base_url = "https://fantasy.premierleague.com/api/entry/"
-    full_url = base_url + str(entry_id) + "/"
-    response = ''
-    while response == '':
-        try:
-            response = requests.get(full_url)
-        except:
-            time.sleep(5)
-    if response.status_code != 200:
-        raise Exception("Response was code " + str(response.status_code))
-    data = json.loads(response.text)
-    return data
+    return get_json("entry/" + str(entry_id) + "/")
 
-def get_entry_gws_data(entry_id,num_gws,start_gw=1):
+def get_entry_gws_data(entry_id,num_gws,start_gw=1,workers=8):
     """ Retrieve the gw-by-gw data for a specific entry/team
 
     Args:
         entry_id (int) : ID of the team whose data is to be retrieved
+        workers (int) : gameweeks fetched at once
     """
-    base_url = "https://fantasy.premierleague.com/api/entry/"
-    gw_data = []
-    for i in range(start_gw, num_gws+1):
-        full_url = base_url + str(entry_id) + "/event/" + str(i) + "/picks/"
-        response = ''
-        while response == '':
-            try:
-                response = requests.get(full_url)
-            except:
-                time.sleep(5)
-        if response.status_code != 200:
-            raise Exception("Response was code " + str(response.status_code))
-        data = json.loads(response.text)
-        gw_data += [data]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        gw_data = list(pool.map(get_entry_picks_data, [entry_id] * (num_gws - start_gw + 1), range(start_gw, num_gws+1)))
     return gw_data
 
+def get_entry_picks_data(entry_id, gw, missing=False):
+    """ Retrieve the picks of a specific entry/team in one gameweek
+
+    Args:
+        entry_id (int) : ID of the team whose data is to be retrieved
+        gw (int) : gameweek
+        missing (bool) : return None for a gameweek before the entry joined (404) instead of raising
+    """
+    return get_json("entry/" + str(entry_id) + "/event/" + str(gw) + "/picks/", missing=missing)
+
+def get_league_standings(league_id, page=1):
+    """ Retrieve one page (50 entries) of the standings of a classic league
+
+    Args:
+        league_id (int) : ID of the league, 314 is the overall league
+        page (int) : page of the standings, from 1
+    """
+    return get_json("leagues-classic/" + str(league_id) + "/standings/?page_standings=" + str(page))
+
 def get_entry_transfers_data(entry_id):
     """ Retrieve the transfer data for a specific entry/team
 
     Args:
         entry_id (int) : ID of the team whose data is to be retrieved
     """
-    base_url = "https://fantasy.premierleague.com/api/entry/"
-    full_url = base_url + str(entry_id) + "/transfers/"
-    response = ''
-    while response == '':
-        try:
-            response = requests.get(full_url)
-        except:
-            time.sleep(5)
-    if response.status_code != 200:
-        raise Exception("Response was code " + str(response.status_code))
-    data = json.loads(response.text)
-    return data
+    return get_json("entry/" + str(entry_id) + "/transfers/")
 
 def get_fixtures_data():
     """ Retrieve the fixtures data for the season
     """
-    url = "https://fantasy.premierleague.com/api/fixtures/"
-    response = ''
-    while response == '':
-        try:
-            response = requests.get(url)
-        except:
-            time.sleep(5)
-    if response.status_code != 200:
-        raise Exception("Response was code " + str(response.status_code))
-    data = json.loads(response.text)
-    return data
+    return get_json("fixtures/")
 
 def main():
     data = get_data()
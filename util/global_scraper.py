@@ -3,15 +3,96 @@ from cleaners import *
 from getters import *
 from collector import collect_gw, merge_gw
 from understat import parse_epl_data
+from concurrent.futures import ThreadPoolExecutor
+import argparse
 import csv
+import json
+import time
 
-def parse_data():
+SEASON = '2025-26'
+# Concurrent element-summary requests
+WORKERS = 8
+# bootstrap-static element fields that change when a player's element-summary does
+DELTA_FIELDS = ['total_points', 'minutes', 'now_cost', 'transfers_in_event', 'news']
+# What the last complete scrape fetched and wrote, the state of the current event it saw and the
+# DELTA_FIELDS of every player it left up to date (the baseline of the next incremental scrape)
+MANIFEST = 'scrape_manifest.json'
+
+def delta_baseline(elements):
+    """ player id (as the manifest's JSON keys) -> str() of its DELTA_FIELDS
+    """
+    return {str(e['id']): {field: str(e.get(field)) for field in DELTA_FIELDS} for e in elements}
+
+def changed_players(elements, baseline, player_base_filename, player_ids):
+    """ Players whose DELTA_FIELDS differ from the baseline of the last complete scrape, or who have no
+    files yet
+
+    Args:
+        elements (list): bootstrap-static elements
+        baseline (dict): the last manifest's baseline
+    Returns:
+        dict: player id -> changed fields ('new' for a player not scraped before)
+    """
+    changed = {}
+    current = delta_baseline(elements)
+    for e in elements:
+        previous = baseline.get(str(e['id']))
+        name = player_ids.get(e['id'])
+        if previous is None or name is None or not os.path.isdir(player_base_filename + name + '_' + str(e['id'])):
+            changed[e['id']] = ['new']
+            continue
+        fields = [field for field in DELTA_FIELDS if current[str(e['id'])][field] != previous.get(field)]
+        if fields:
+            changed[e['id']] = fields
+    return changed
+
+def event_state(events):
+    """ The current event and how far it is scored, a scrape of another state fetches every player
+    """
+    for event in events:
+        if event["is_current"] == True:
+            return {'gw': event['id'], 'finished': event.get('finished'), 'data_checked': event.get('data_checked')}
+    return {'gw': 0, 'finished': None, 'data_checked': None}
+
+def read_manifest(base_filename):
+    path = base_filename + MANIFEST
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def write_manifest(base_filename, manifest):
+    path = base_filename + MANIFEST
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+def fetch_player_data(player_ids, workers=WORKERS, revalidate=False):
+    """ Fetch the element-summary of every player on a pool of workers sharing the getters' session
+
+    Args:
+        player_ids (list): IDs of the players, their data is yielded in this order as it arrives
+        workers (int): requests in flight at once
+        revalidate (bool): skip the cache TTL, the players are known to have changed
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(lambda i: get_individual_player_data(i, revalidate), player_ids)
+
+def parse_data(season=SEASON, workers=WORKERS, incremental=False):
     """ Parse and store all the data
+
+    Args:
+        incremental (bool): only fetch the players whose bootstrap-static fields changed since the last
+            complete scrape (every player when the current event moved on or got scored since)
     """
-    season = '2025-26'
     base_filename = 'data/' + season + '/'
     print("Getting data")
     data = get_data()
+    state = event_state(data["events"])
+    manifest = read_manifest(base_filename)
+    if incremental and (manifest is None or 'baseline' not in manifest or manifest['event'] != state):
+        print("Current event changed since the last scrape, fetching every player")
+        incremental = False
     print("Parsing summary data")
     parse_players(data["elements"], base_filename)
     xPoints = []
@@ -38,10 +119,28 @@ def parse_data():
     player_base_filename = base_filename + 'players/'
     gw_base_filename = base_filename + 'gws/'
     print("Extracting player specific data")
-    for i,name in player_ids.items():
-        player_data = get_individual_player_data(i)
+    if incremental:
+        changed = changed_players(data["elements"], manifest['baseline'], player_base_filename, player_ids)
+        player_ids = {i: name for i, name in player_ids.items() if i in changed}
+        print(f"{len(player_ids)} of {num_players} players changed")
+    files = []
+    players_data = fetch_player_data(list(player_ids), workers, revalidate=incremental)
+    for (i,name), player_data in zip(player_ids.items(), players_data):
         parse_player_history(player_data["history_past"], player_base_filename, name, i)
         parse_player_gw_history(player_data["history"], player_base_filename, name, i)
+        files += [player_base_filename + name + '_' + str(i) + '/' + f
+                  for f, rows in [('history.csv', player_data["history_past"]), ('gw.csv', player_data["history"])] if rows]
+    # only now that every changed player is written does this bootstrap become the baseline, a scrape that
+    # dies on the way leaves the last one so the next incremental scrape still sees those players as changed
+    write_manifest(base_filename, {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'mode': 'incremental' if incremental else 'full',
+        'event': state,
+        'changed': changed if incremental else None,
+        'fetched': list(player_ids),
+        'files': files,
+        'baseline': delta_baseline(data["elements"]),
+    })
     if gw_num > 0:
         print("Writing expected points")
         with open(os.path.join(gw_base_filename, 'xP' + str(gw_num) + '.csv'), 'w+') as outf:
@@ -61,7 +160,19 @@ def fixtures(base_filename):
     parse_fixtures(data, base_filename)
 
 def main():
-    parse_data()
+    parser = argparse.ArgumentParser(description='Scrape the season from the FPL API')
+    parser.add_argument('--season', default=SEASON)
+    parser.add_argument('--workers', type=int, default=WORKERS, help='concurrent player requests')
+    parser.add_argument('--rate', type=float, help='maximum requests per second')
+    parser.add_argument('--base-url', help='API root, e.g. a local stand-in server (default FPL_API_URL or the FPL API)')
+    parser.add_argument('--no-cache', action='store_true', help='download every response instead of revalidating the cached ones')
+    parser.add_argument('--incremental', action='store_true', help='only fetch the players that changed since the last scrape')
+    args = parser.parse_args()
+
+    configure(base_url=args.base_url, rate=args.rate, pool_size=max(args.workers, POOL_SIZE), cache=False if args.no_cache else None)
+    parse_data(args.season, args.workers, args.incremental)
+    if get_cache():
+        get_cache().print_report()
 
 if __name__ == "__main__":
     main()
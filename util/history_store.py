@@ -0,0 +1,299 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Compiled store of every season's players/<name>/gw.csv and history.csv, one directory per season and table
+# with a .npy file per column, so a scan only memory-maps the columns it reads.
+#
+#   <STORE_DIR>/meta.json                        seasons, tables, columns and their kind
+#   <STORE_DIR>/dictionaries/<column>.npy        values of a dictionary encoded column (name, team, ...)
+#   <STORE_DIR>/<season>/<table>/<column>.npy    rows sorted by (element, round)
+#   <STORE_DIR>/<season>/<table>/_elements.npy   index: the elements of the season, sorted
+#   <STORE_DIR>/<season>/<table>/_offsets.npy    index: first row of each element, and the row count last
+
+STORE_DIR = '.cache/history'
+DATA_DIR = 'data'
+TABLES = ['gw', 'history']
+# Older seasons were scraped as latin-1
+ENCODINGS = ['utf-8', 'latin-1']
+# Parsed to datetime64[s] instead of dictionary encoded
+TIME_COLUMNS = {'kickoff_time'}
+# Rows of a table are sorted by these within a season
+SORT_COLUMNS = {'gw': ['element', 'round'], 'history': ['element_code', 'season_name']}
+
+
+def list_seasons(data_dir=DATA_DIR):
+    """ Seasons under data_dir with a players directory
+    """
+    return sorted(s for s in os.listdir(data_dir) if re.match(r'^\d{4}-\d{2}$', s) and os.path.isdir(os.path.join(data_dir, s, 'players')))
+
+
+def read_csv(path):
+    for encoding in ENCODINGS:
+        try:
+            return pd.read_csv(path, encoding=encoding)
+        except UnicodeDecodeError:
+            continue
+    raise ValueError(f'Could not decode {path}')
+
+
+def player_name(directory):
+    """ 'Aaron_Ramsdale_674' and 'Aaron_Ramsdale' (older seasons) -> 'Aaron Ramsdale'
+    """
+    return re.sub(r'_\d+$', '', directory).replace('_', ' ')
+
+
+def read_season(season, table, data_dir=DATA_DIR):
+    """ Concatenate a season's players/*/<table>.csv, adding the player name (and team, for gw) columns
+
+    Args:
+        season (str): e.g. '2024-25'
+        table (str): 'gw' or 'history'
+    """
+    season_dir = os.path.join(data_dir, season)
+    teams = season_teams(season, data_dir)
+
+    frames = []
+    for directory in sorted(os.listdir(os.path.join(season_dir, 'players'))):
+        path = os.path.join(season_dir, 'players', directory, f'{table}.csv')
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            continue
+        df = read_csv(path)
+        if df.empty:
+            continue
+        df['name'] = player_name(directory)
+        if table == 'gw' and 'element' in df:
+            df['team'] = df['element'].map(teams)
+        frames.append(df)
+
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True, sort=False)
+
+
+def season_teams(season, data_dir=DATA_DIR):
+    """ element -> name of the team the player ended the season at (players_raw.csv team id, named by
+    master_team_list.csv, or the season's teams.csv for the seasons it doesn't cover yet)
+    """
+    players_raw = os.path.join(data_dir, season, 'players_raw.csv')
+    if not os.path.exists(players_raw):
+        return {}
+    players = read_csv(players_raw)[['id', 'team']]
+    team_list = pd.read_csv(os.path.join(data_dir, 'master_team_list.csv'))
+    team_list = team_list[team_list['season'] == season]
+    names = dict(zip(team_list['team'], team_list['team_name']))
+    teams_csv = os.path.join(data_dir, season, 'teams.csv')
+    if not names and os.path.exists(teams_csv):
+        teams = read_csv(teams_csv)
+        names = dict(zip(teams['id'], teams['name']))
+    return {pid: names.get(team, str(team)) for pid, team in zip(players['id'], players['team'])}
+
+
+def to_columns(df, dictionaries):
+    """ Turn a frame into numpy columns: numbers and booleans as they are, kickoff times as datetime64[s] and
+    everything else dictionary encoded (int32 codes into dictionaries[column], grown as new values turn up).
+    Returns the columns and the kind of each one.
+    """
+    columns, kinds = {}, {}
+    for name in df.columns:
+        values = df[name]
+        if name in TIME_COLUMNS:
+            columns[name] = pd.to_datetime(values, utc=True, errors='coerce').dt.tz_localize(None).to_numpy(dtype='datetime64[s]')
+            kinds[name] = 'time'
+        elif values.dtype == bool:
+            columns[name] = values.to_numpy()
+            kinds[name] = 'bool'
+        elif values.dtype == object and values.dropna().isin([True, False, 'True', 'False']).all():
+            columns[name] = values.map({True: True, 'True': True}).fillna(False).to_numpy(dtype=bool)
+            kinds[name] = 'bool'
+        elif values.dtype == object:
+            dictionary = dictionaries.setdefault(name, {})
+            strings = values.fillna('').astype(str)
+            for value in strings.unique():
+                dictionary.setdefault(value, len(dictionary))
+            columns[name] = strings.map(dictionary).to_numpy(dtype=np.int32)
+            kinds[name] = 'dictionary'
+        else:
+            columns[name] = values.to_numpy()
+            kinds[name] = 'number'
+    return columns, kinds
+
+
+def build_index(elements):
+    """ Elements of a table sorted by element, and the offset of each one's first row (plus the row count)
+    """
+    ids, starts = np.unique(elements, return_index=True)
+    return ids, np.append(starts, len(elements))
+
+
+def compile_store(store_dir=STORE_DIR, data_dir=DATA_DIR, seasons=None):
+    """ Compile every season (or `seasons`) under data_dir into a fresh store at store_dir
+    """
+    seasons = seasons or list_seasons(data_dir)
+    tmp = store_dir + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    dictionaries = {}
+    meta = {'seasons': {}, 'compiled_at': time.time()}
+    for season in seasons:
+        meta['seasons'][season] = {}
+        for table in TABLES:
+            df = read_season(season, table, data_dir)
+            if df is None:
+                continue
+
+            key = [c for c in SORT_COLUMNS[table] if c in df]
+            df = df.sort_values(key, kind='stable').reset_index(drop=True) if key else df
+            columns, kinds = to_columns(df, dictionaries)
+
+            table_dir = os.path.join(tmp, season, table)
+            os.makedirs(table_dir)
+            for name, column in columns.items():
+                np.save(os.path.join(table_dir, f'{name}.npy'), column)
+            index_column = key[0] if key else None
+            if index_column:
+                elements, offsets = build_index(columns[index_column])
+                np.save(os.path.join(table_dir, '_elements.npy'), elements)
+                np.save(os.path.join(table_dir, '_offsets.npy'), offsets)
+
+            meta['seasons'][season][table] = {'rows': len(df), 'columns': kinds, 'index': index_column}
+            print(f'{season} {table}: {len(df)} rows, {len(columns)} columns')
+
+    os.makedirs(os.path.join(tmp, 'dictionaries'))
+    for name, dictionary in dictionaries.items():
+        np.save(os.path.join(tmp, 'dictionaries', f'{name}.npy'), np.array(list(dictionary), dtype=str))
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp, store_dir)
+
+
+class HistoryStore:
+    """ Reader of a compiled store. Columns are memory-mapped on first use, so only what's read is paged in.
+    """
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self._dictionaries = {}
+
+    @property
+    def seasons(self):
+        return list(self.meta['seasons'])
+
+    def columns(self, season, table='gw'):
+        return self.meta['seasons'][season].get(table, {}).get('columns', {})
+
+    def column(self, season, name, table='gw'):
+        """ One column of a season as a read-only memory map (None if the season doesn't have it)
+        """
+        if name not in self.columns(season, table):
+            return None
+        return np.load(os.path.join(self.store_dir, season, table, f'{name}.npy'), mmap_mode='r')
+
+    def dictionary(self, name):
+        if name not in self._dictionaries:
+            self._dictionaries[name] = np.load(os.path.join(self.store_dir, 'dictionaries', f'{name}.npy'))
+        return self._dictionaries[name]
+
+    def season(self, season, columns, table='gw'):
+        """ Requested columns of one season, memory-mapped (no copy)
+        """
+        return {name: self.column(season, name, table) for name in columns}
+
+    def load(self, columns, seasons=None, table='gw', decode=False):
+        """ Requested columns over `seasons` (default all) concatenated, plus a 'season' column. Seasons that
+        don't have a column get NaN (-1 for dictionary codes). Dictionary columns stay codes unless decode.
+        """
+        seasons = seasons or self.seasons
+        seasons = [s for s in seasons if table in self.meta['seasons'][s]]
+        out = {'season': np.repeat(np.array(seasons), [self.meta['seasons'][s][table]['rows'] for s in seasons])}
+
+        for name in columns:
+            parts = []
+            for s in seasons:
+                column = self.column(s, name, table)
+                if column is None:
+                    rows = self.meta['seasons'][s][table]['rows']
+                    column = np.full(rows, -1 if self.kind(name, table) == 'dictionary' else np.nan)
+                parts.append(column)
+            out[name] = np.concatenate(parts) if parts else np.array([])
+            if decode and self.kind(name, table) == 'dictionary':
+                out[name] = np.where(out[name] >= 0, self.dictionary(name)[np.maximum(out[name], 0)], '')
+        return out
+
+    def kind(self, name, table='gw'):
+        for s in self.seasons:
+            kind = self.columns(s, table).get(name)
+            if kind:
+                return kind
+        raise KeyError(f'No column {name} in the {table} table')
+
+    def lookup(self, season, element, columns, table='gw', round=None):
+        """ Rows of one element in a season (optionally one round) through the (season, element, round) index
+        """
+        table_dir = os.path.join(self.store_dir, season, table)
+        elements = np.load(os.path.join(table_dir, '_elements.npy'), mmap_mode='r')
+        offsets = np.load(os.path.join(table_dir, '_offsets.npy'), mmap_mode='r')
+
+        i = np.searchsorted(elements, element)
+        if i == len(elements) or elements[i] != element:
+            return {name: np.array([]) for name in columns}
+        start, end = int(offsets[i]), int(offsets[i + 1])
+
+        if round is not None and table == 'gw':
+            rounds = self.column(season, 'round', table)[start:end]
+            lo, hi = np.searchsorted(rounds, [round, round + 1])
+            start, end = start + lo, start + hi
+        return {name: np.asarray(self.column(season, name, table)[start:end]) for name in columns}
+
+
+def scan_csvs(column, data_dir=DATA_DIR):
+    """ The same full-history scan straight from the CSVs, as the baseline
+    """
+    total = 0
+    for season in list_seasons(data_dir):
+        df = read_season(season, 'gw', data_dir)
+        if df is not None and column in df:
+            total += df[column].sum()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile or scan the historical columnar store')
+    sub = parser.add_subparsers(dest='command', required=True)
+    compile_parser = sub.add_parser('compile', help='compile data/<season>/players/*/{gw,history}.csv into the store')
+    compile_parser.add_argument('--seasons', nargs='*')
+    compile_parser.add_argument('--store', default=STORE_DIR)
+    scan_parser = sub.add_parser('scan', help='sum a gw column over every season, from the store (and the CSVs with --compare)')
+    scan_parser.add_argument('column', nargs='?', default='total_points')
+    scan_parser.add_argument('--store', default=STORE_DIR)
+    scan_parser.add_argument('--compare', action='store_true')
+    args = parser.parse_args()
+
+    if args.command == 'compile':
+        start = time.perf_counter()
+        compile_store(args.store, seasons=args.seasons)
+        print(f'Compiled in {time.perf_counter() - start:.1f} s')
+        return
+
+    start = time.perf_counter()
+    total = np.nansum(HistoryStore(args.store).load([args.column])[args.column])
+    print(f'store: {args.column} = {total} in {time.perf_counter() - start:.3f} s')
+    if args.compare:
+        start = time.perf_counter()
+        total = scan_csvs(args.column)
+        print(f'csv:   {args.column} = {total} in {time.perf_counter() - start:.3f} s')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# On-disk cache of API responses. Each response is stored with its ETag / Last-Modified. Within the TTL of its
+# endpoint a response is served straight from disk, afterwards it is revalidated with a conditional request
+# and served from disk again on a 304. Least recently used responses are evicted past max_bytes.
+
+HTTP_CACHE_DIR = '.cache/http'
+MAX_BYTES = 512 * 1024 * 1024
+# Seconds a response is served without asking the API again, by endpoint (first segment of the path)
+TTLS = {
+    'bootstrap-static': 0,
+    'fixtures': 300,
+    'element-summary': 300,
+    'entry': 3600,
+    'leagues-classic': 300,
+}
+DEFAULT_TTL = 0
+OUTCOMES = ['fresh', 'revalidated', 'miss']
+
+
+def endpoint(path):
+    """ 'element-summary/1/' -> 'element-summary'
+    """
+    return path.strip('/').split('/')[0]
+
+
+class ResponseCache:
+
+    def __init__(self, directory=HTTP_CACHE_DIR, max_bytes=MAX_BYTES, ttls=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = {**TTLS, **(ttls or {})}
+        self.lock = threading.Lock()
+        self.counts = {}
+        os.makedirs(directory, exist_ok=True)
+        self.nbytes = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory) if f.endswith('.json'))
+
+    def path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest() + '.json')
+
+    def get(self, url):
+        """ The stored entry of url ({'url', 'etag', 'last_modified', 'fetched', 'body'}), or None
+        """
+        try:
+            with open(self.path(url)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry, path):
+        return time.time() - entry['fetched'] < self.ttls.get(endpoint(path), DEFAULT_TTL)
+
+    def headers(self, entry):
+        """ Conditional request headers revalidating entry
+        """
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def hit(self, url, path, entry, outcome):
+        """ Count a response served from disk, a 'revalidated' one (304) starting its TTL over
+        """
+        self.count(path, outcome, len(entry['body']))
+        if outcome == 'revalidated':
+            entry['fetched'] = time.time()
+            self.write(url, entry)
+        else:
+            try:
+                os.utime(self.path(url))
+            except OSError:
+                pass
+
+    def store(self, url, path, response):
+        self.count(path, 'miss', 0)
+        entry = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched': time.time(),
+            'body': response.text,
+        }
+        self.write(url, entry)
+
+    def write(self, url, entry):
+        path = self.path(url)
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(entry, f)
+        size = os.path.getsize(tmp)
+        with self.lock:
+            old = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp, path)
+            self.nbytes += size - old
+            if self.nbytes > self.max_bytes:
+                self.evict()
+
+    def evict(self):
+        """ Drop least recently used responses until the cache fits in max_bytes (called holding the lock)
+        """
+        files = [os.path.join(self.directory, f) for f in os.listdir(self.directory) if f.endswith('.json')]
+        for path in sorted(files, key=os.path.getmtime):
+            if self.nbytes <= self.max_bytes:
+                break
+            self.nbytes -= os.path.getsize(path)
+            os.remove(path)
+
+    def count(self, path, outcome, saved):
+        with self.lock:
+            counts = self.counts.setdefault(endpoint(path), {**{o: 0 for o in OUTCOMES}, 'bytes_saved': 0})
+            counts[outcome] += 1
+            counts['bytes_saved'] += saved
+
+    def report(self):
+        """ Requests, outcomes and hit ratio (responses served from disk) by endpoint
+        """
+        report = {}
+        with self.lock:
+            for name, counts in sorted(self.counts.items()):
+                requests = sum(counts[o] for o in OUTCOMES)
+                report[name] = {'requests': requests, **counts, 'hit_ratio': (counts['fresh'] + counts['revalidated']) / requests}
+        return report
+
+    def print_report(self):
+        for name, r in self.report().items():
+            print(f"{name}: {r['requests']} requests, {r['fresh']} fresh, {r['revalidated']} revalidated, {r['miss']} downloaded, "
+                  f"hit ratio {r['hit_ratio']:.0%}, {r['bytes_saved'] / 1e6:.1f} MB not downloaded")
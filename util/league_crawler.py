@@ -0,0 +1,223 @@
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from getters import POOL_SIZE, configure, get_cache, get_entry_picks_data, get_league_standings
+
+# Crawl of the top managers of a classic league and their picks, written as columnar parts that a rerun
+# resumes from:
+#
+#   <output_dir>/checkpoint.json                     league, gameweeks, parts written and entries they hold
+#   <output_dir>/<table>/part-<n>/<column>.npy       standings, gw_info or picks
+#
+# A part is written to a temporary directory and renamed, and only counts once the checkpoint lists it, so a
+# crash leaves at most a part that the rerun drops and fetches again.
+
+OVERALL_LEAGUE = 314
+STANDINGS_PAGE_SIZE = 50
+# Requests in flight at once
+WORKERS = 32
+# Managers per written part (and checkpoint)
+FLUSH_ENTRIES = 500
+CHECKPOINT = 'checkpoint.json'
+
+TABLES = {
+    'standings': ['rank', 'entry', 'player_name', 'entry_name', 'total'],
+    'gw_info': ['entry', 'gw', 'points', 'points_on_bench', 'rank', 'event_transfers', 'event_transfers_cost',
+                'total_points', 'overall_rank', 'value', 'chip'],
+    'picks': ['entry', 'gw', 'element', 'position', 'multiplier', 'is_captain', 'is_vice_captain'],
+}
+STRING_COLUMNS = {'player_name', 'entry_name', 'chip'}
+
+
+def to_part(table, rows):
+    """ Rows (tuples in TABLES[table] order) as numpy columns
+    """
+    columns = list(zip(*rows)) if rows else [()] * len(TABLES[table])
+    return {name: np.array(values, dtype=str if name in STRING_COLUMNS else np.int64)
+            for name, values in zip(TABLES[table], columns)}
+
+
+def read_table(output_dir, table):
+    """ Every part of a table concatenated, column name -> array (parts memory-mapped, strings loaded)
+    """
+    checkpoint = read_checkpoint(output_dir)
+    parts = checkpoint['parts'].get(table, 0) if checkpoint else 0
+    columns = {name: [] for name in TABLES[table]}
+    for n in range(parts):
+        part_dir = os.path.join(output_dir, table, f'part-{n:05d}')
+        for name in columns:
+            columns[name].append(np.load(os.path.join(part_dir, f'{name}.npy'), mmap_mode=None if name in STRING_COLUMNS else 'r'))
+    return {name: np.concatenate(arrays) if arrays else to_part(table, [])[name] for name, arrays in columns.items()}
+
+
+def read_checkpoint(output_dir):
+    path = os.path.join(output_dir, CHECKPOINT)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class LeagueCrawler:
+    """ Crawls the top `managers` of a classic league (standings pages fetched concurrently) and then the
+    picks of each of them in every one of `gws`, on a bounded pool of requests. Rate limiting, the shared
+    session and the response cache are the getters' (see getters.configure).
+    """
+
+    def __init__(self, league_id, gws, output_dir, managers=10000, workers=WORKERS, flush_entries=FLUSH_ENTRIES):
+        self.league_id = league_id
+        self.gws = list(gws)
+        self.output_dir = output_dir
+        self.managers = managers
+        self.workers = workers
+        self.flush_entries = flush_entries
+
+        os.makedirs(output_dir, exist_ok=True)
+        checkpoint = read_checkpoint(output_dir)
+        params = {'league': league_id, 'gws': self.gws, 'managers': managers}
+        if checkpoint is not None and checkpoint['params'] != params:
+            raise ValueError(f'{output_dir} holds a crawl of {checkpoint["params"]}, not {params}')
+        self.checkpoint = checkpoint or {'params': params, 'parts': {}, 'done': []}
+        self.drop_unlisted_parts()
+
+    def crawl(self):
+        if not self.checkpoint['parts'].get('standings'):
+            self.crawl_standings()
+        self.crawl_picks()
+
+    def entries(self):
+        return read_table(self.output_dir, 'standings')['entry'].tolist()
+
+    def crawl_standings(self):
+        pages = math.ceil(self.managers / STANDINGS_PAGE_SIZE)
+        print(f'Fetching {pages} standings pages of league {self.league_id}')
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(lambda page: get_league_standings(self.league_id, page), range(1, pages + 1)))
+
+        # a manager moving up between page requests can turn up twice, the first one is kept
+        rows, seen = [], set()
+        for data in results:
+            for m in data['standings']['results']:
+                if m['entry'] not in seen:
+                    seen.add(m['entry'])
+                    rows.append((m['rank'], m['entry'], m['player_name'], m['entry_name'], m['total']))
+            if not data['standings']['has_next']:
+                break
+        self.write_part('standings', rows[:self.managers])
+        self.write_checkpoint()
+
+    def crawl_picks(self):
+        """ Fetch every (entry, gameweek) not in a written part yet, keeping at most `workers` requests in flight,
+        and write the managers whose gameweeks are all in every `flush_entries` of them
+        """
+        done = set(self.checkpoint['done'])
+        todo = [(entry, gw) for entry in self.entries() if entry not in done for gw in self.gws]
+        print(f'{len(done)} managers done, fetching {len(todo)} picks')
+
+        results = {}
+        finished = []
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            tasks = iter(todo)
+            pending = {}
+            while True:
+                for entry, gw in tasks:
+                    pending[pool.submit(get_entry_picks_data, entry, gw, True)] = (entry, gw)
+                    if len(pending) >= 2 * self.workers:
+                        break
+                if not pending:
+                    break
+                completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    entry, gw = pending.pop(future)
+                    entry_results = results.setdefault(entry, {})
+                    entry_results[gw] = future.result()
+                    if len(entry_results) == len(self.gws):
+                        finished.append(entry)
+                if len(finished) >= self.flush_entries:
+                    self.flush(finished, results)
+                    finished = []
+            self.flush(finished, results)
+
+        print(f'Fetched {len(todo)} picks in {time.perf_counter() - start:.1f} s')
+
+    def flush(self, entries, results):
+        if not entries:
+            return
+        gw_info, picks = [], []
+        for entry in entries:
+            entry_results = results.pop(entry)
+            for gw in self.gws:
+                data = entry_results[gw]
+                if data is None:  # before the manager joined
+                    continue
+                h = data['entry_history']
+                gw_info.append((entry, gw, h['points'], h['points_on_bench'], h['rank'] or 0, h['event_transfers'],
+                                h['event_transfers_cost'], h['total_points'], h['overall_rank'] or 0, h['value'],
+                                data['active_chip'] or ''))
+                picks += [(entry, gw, p['element'], p['position'], p['multiplier'], p['is_captain'], p['is_vice_captain'])
+                          for p in data['picks']]
+        self.write_part('gw_info', gw_info)
+        self.write_part('picks', picks)
+        self.checkpoint['done'] += entries
+        self.write_checkpoint()
+        print(f"{len(self.checkpoint['done'])} managers done")
+
+    def write_part(self, table, rows):
+        n = self.checkpoint['parts'].get(table, 0)
+        part_dir = os.path.join(self.output_dir, table, f'part-{n:05d}')
+        tmp = part_dir + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, column in to_part(table, rows).items():
+            np.save(os.path.join(tmp, f'{name}.npy'), column)
+        shutil.rmtree(part_dir, ignore_errors=True)
+        os.replace(tmp, part_dir)
+        self.checkpoint['parts'][table] = n + 1
+
+    def write_checkpoint(self):
+        path = os.path.join(self.output_dir, CHECKPOINT)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.checkpoint, f)
+        os.replace(path + '.tmp', path)
+
+    def drop_unlisted_parts(self):
+        """ Remove parts written after the last checkpoint (by a crawl that stopped before checkpointing them)
+        """
+        for table in TABLES:
+            table_dir = os.path.join(self.output_dir, table)
+            if not os.path.isdir(table_dir):
+                continue
+            for name in os.listdir(table_dir):
+                if name.endswith('.tmp') or int(name.split('-')[1]) >= self.checkpoint['parts'].get(table, 0):
+                    shutil.rmtree(os.path.join(table_dir, name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl the standings of a classic league and the picks of its top managers')
+    parser.add_argument('output_dir')
+    parser.add_argument('--league', type=int, default=OVERALL_LEAGUE)
+    parser.add_argument('--managers', type=int, default=10000)
+    parser.add_argument('--gws', type=int, nargs='+', required=True)
+    parser.add_argument('--workers', type=int, default=WORKERS, help='requests in flight')
+    parser.add_argument('--rate', type=float, help='maximum requests per second')
+    parser.add_argument('--base-url', help='API root, e.g. a local mock API (default FPL_API_URL or the FPL API)')
+    parser.add_argument('--cache', action='store_true', help='keep the responses in the getters\' cache (off, the checkpoints make reruns resume)')
+    args = parser.parse_args()
+
+    configure(base_url=args.base_url, rate=args.rate, pool_size=max(args.workers, POOL_SIZE), cache=None if args.cache else False)
+    LeagueCrawler(args.league, args.gws, args.output_dir, args.managers, args.workers).crawl()
+    if get_cache():
+        get_cache().print_report()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+# Local stand-in for the FPL API, serving a season already scraped under data/<season>/ so the scrapers
+# can be run (and checked) without hitting the real API:
+#
+#   /api/bootstrap-static/             players_raw.csv as the elements, teams.csv, the events of fixtures.csv
+#                                      (the last scraped gameweek current)
+#   /api/fixtures/                     fixtures.csv
+#   /api/element-summary/<id>/         players/<name>_<id>/gw.csv as history, history.csv as history_past
+#   /api/leagues-classic/<id>/standings/?page_standings=<n>
+#   /api/entry/<id>/event/<gw>/picks/  made up managers of any league, with seeded random picks
+#
+# Every response carries an ETag and a matching If-None-Match gets a 304, like the API's CDN does.
+#
+#   python util/standin_api.py --season 2025-26 --port 8000
+#   python util/global_scraper.py --base-url http://127.0.0.1:8000/api/
+#   python util/league_crawler.py out/ --managers 3000 --gws 1 2 3 --base-url http://127.0.0.1:8000/api/
+
+DATA_DIR = 'data'
+PORT = 8000
+# Managers in the standings of every league
+MANAGERS = 3000
+STANDINGS_PAGE_SIZE = 50
+
+
+def read_records(path):
+    """ A CSV as the API's JSON records (empty or missing files as no records)
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return []
+    return json.loads(pd.read_csv(path).to_json(orient='records'))
+
+
+def deadline_time(kickoff):
+    """ '2025-08-15T19:00:00Z' -> '2025-08-15T17:30:00Z'
+    """
+    deadline = datetime.strptime(kickoff, '%Y-%m-%dT%H:%M:%SZ') - timedelta(minutes=90)
+    return deadline.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class StandinAPI:
+    """ Payloads of the stand-in and what it was asked for. Elements and player summaries can be edited
+    while it serves (`update_player`), and `failing` element-summaries answer 500, to drive the scraper
+    through a changed or broken API.
+    """
+
+    def __init__(self, season, data_dir=DATA_DIR, delay=0.0, managers=MANAGERS):
+        season_dir = os.path.join(data_dir, season)
+        self.delay = delay
+        self.managers = managers
+        self.elements = read_records(os.path.join(season_dir, 'players_raw.csv'))
+        self.players = {}
+        players_dir = os.path.join(season_dir, 'players')
+        for name in sorted(os.listdir(players_dir)):
+            m = re.search(r'_(\d+)$', name)
+            if m:
+                self.players[int(m.group(1))] = {
+                    'history': read_records(os.path.join(players_dir, name, 'gw.csv')),
+                    'history_past': read_records(os.path.join(players_dir, name, 'history.csv')),
+                }
+        self.teams = read_records(os.path.join(season_dir, 'teams.csv'))
+        self.fixtures = read_records(os.path.join(season_dir, 'fixtures.csv'))
+        gw = max((row['round'] for p in self.players.values() for row in p['history']), default=0)
+        # every event of the fixtures, with its deadline 90 minutes before its first kickoff
+        kickoffs = {}
+        for f in self.fixtures:
+            if f.get('event') and f.get('kickoff_time'):
+                event = int(f['event'])
+                kickoffs[event] = min(kickoffs.get(event, f['kickoff_time']), f['kickoff_time'])
+        self.events = [{'id': i, 'is_current': i == gw, 'finished': i < gw, 'data_checked': i < gw,
+                        'deadline_time': deadline_time(kickoffs[i]) if i in kickoffs else None}
+                       for i in range(1, max([gw, *kickoffs]) + 1)]
+
+        self.failing = set()
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def payload(self, path):
+        """ The JSON body of an API path, None if there's no such path (404)
+        """
+        if path == 'bootstrap-static/':
+            return {'elements': self.elements, 'events': self.events, 'teams': self.teams}
+        if path == 'fixtures/':
+            return self.fixtures
+        m = re.match(r'^element-summary/(\d+)/$', path)
+        if m:
+            if int(m.group(1)) in self.failing:
+                raise RuntimeError(f'element-summary {m.group(1)} set to fail')
+            return self.players.get(int(m.group(1)), {'history': [], 'history_past': []})
+        m = re.match(r'^leagues-classic/(\d+)/standings/\?page_standings=(\d+)$', path)
+        if m:
+            return self.standings(int(m.group(2)))
+        m = re.match(r'^entry/(\d+)/event/(\d+)/picks/$', path)
+        if m:
+            return self.picks(int(m.group(1)), int(m.group(2)))
+        return None
+
+    def entry(self, rank):
+        return 1000 + 7 * rank
+
+    def standings(self, page):
+        ranks = range((page - 1) * STANDINGS_PAGE_SIZE + 1, min(page * STANDINGS_PAGE_SIZE, self.managers) + 1)
+        return {'standings': {'has_next': page * STANDINGS_PAGE_SIZE < self.managers, 'page': page, 'results': [
+            {'rank': r, 'entry': self.entry(r), 'player_name': f'Manager {r}', 'entry_name': f'Team {r}', 'total': 10 ** 4 - r}
+            for r in ranks]}}
+
+    def picks(self, entry, gw):
+        """ The same picks of an entry in a gameweek on every request. Every 11th entry joined in gameweek 2
+        (a 404 before), every 5th played its wildcard in gameweek 3.
+        """
+        rank, rest = divmod(entry - 1000, 7)
+        if rest or not 1 <= rank <= self.managers or (entry % 11 == 0 and gw == 1):
+            return None
+        r = random.Random(entry * 100 + gw)
+        elements = r.sample([e['id'] for e in self.elements], 15)
+        return {
+            'active_chip': 'wildcard' if gw == 3 and entry % 5 == 0 else None,
+            'entry_history': {'event': gw, 'points': r.randint(20, 100), 'points_on_bench': r.randint(0, 15),
+                              'rank': r.randint(1, 10 ** 6), 'event_transfers': r.randint(0, 3), 'event_transfers_cost': 0,
+                              'total_points': 60 * gw, 'overall_rank': r.randint(1, 10 ** 6), 'value': 1000 + gw},
+            'picks': [{'element': element, 'position': i, 'multiplier': 2 if i == 1 else int(i <= 11),
+                       'is_captain': i == 1, 'is_vice_captain': i == 2} for i, element in enumerate(elements, 1)],
+        }
+
+    def update_player(self, player_id, **fields):
+        """ Set bootstrap-static fields of a player and the same fields of its last gameweek row
+        """
+        with self.lock:
+            element = next(e for e in self.elements if e['id'] == player_id)
+            element.update(fields)
+            history = self.players.setdefault(player_id, {'history': [], 'history_past': []})['history']
+            if history:
+                history[-1].update({k: v for k, v in fields.items() if k in history[-1]})
+
+    def count(self, path, status):
+        with self.lock:
+            counts = self.counts.setdefault(path.strip('/').split('/')[0], {})
+            counts[status] = counts.get(status, 0) + 1
+
+    def reset_counts(self):
+        with self.lock:
+            self.counts = {}
+
+    def serve(self, port=PORT, host='127.0.0.1'):
+        """ An HTTP server of the stand-in (port 0 picks a free one), started by the caller with serve_forever()
+        """
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                path = self.path[len('/api/'):] if self.path.startswith('/api/') else None
+                try:
+                    with api.lock:
+                        body = api.payload(path) if path is not None else None
+                        data = json.dumps(body).encode() if body is not None else None
+                except RuntimeError:
+                    return self.send(500, path)
+                if data is None:
+                    return self.send(404, path or self.path)
+                if api.delay:
+                    time.sleep(api.delay)
+                etag = '"' + hashlib.md5(data).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    return self.send(304, path, etag=etag)
+                self.send(200, path, data, etag)
+
+            def send(self, status, path, data=b'', etag=None):
+                api.count(path, status)
+                self.send_response(status)
+                if etag:
+                    self.send_header('ETag', etag)
+                if data:
+                    self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Server((host, port), Handler)
+
+
+class Server(ThreadingHTTPServer):
+
+    def handle_error(self, request, client_address):
+        # a client killed mid-request (the crawler check does it on purpose) isn't an error of the stand-in
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a scraped season as a local stand-in for the FPL API')
+    parser.add_argument('--season', default='2025-26')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--managers', type=int, default=MANAGERS, help='managers in the standings of a league')
+    args = parser.parse_args()
+
+    server = StandinAPI(args.season, delay=args.delay, managers=args.managers).serve(args.port)
+    print(f'Serving data/{args.season} on http://127.0.0.1:{server.server_address[1]}/api/')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,95 +1,64 @@
-import requests , json, csv
+import argparse, os
 import pandas as pd
+from getters import POOL_SIZE, configure
+from league_crawler import LeagueCrawler, OVERALL_LEAGUE, WORKERS, read_table
 
 # Overall FPL league ID, 314 for 2019/20 season.
-overallLeageID = 314
+overallLeageID = OVERALL_LEAGUE
 
 # number of GW in 2019/20 season. Done as array to avoid calling api for blank GW 30-38.
 gameWeeks = [1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,39,40,
 		41,42,43,44,45,46,47]
 
-# adds the top 10 team ID's to this array
-teamIDarray = []
-
 # number of top manager information required.
 topManagerNumber = 10
 
-url = "https://fantasy.premierleague.com/api/leagues-classic/"+str(overallLeageID)+"/standings/"
-
-response = requests.get(url)
-data = response.text
-parsed = json.loads(data)
-managerParsed = parsed['standings']['results']
-
-# open 3 files for writing
-manager_data = open('data/2019-20/managers/top_managers.csv', 'w', newline='', encoding="utf-8")
-gw_data = open('data/2019-20/managers/top_managers_gwInfo.csv', 'w', newline='', encoding="utf-8")
-gw_picks = open('data/2019-20/managers/top_managers_gwPicks.csv', 'w', newline='', encoding="utf-8")
-
-# create the 3 csv writer objects
-csvwriter1 = csv.writer(manager_data)
-csvwriter2 = csv.writer(gw_data)
-csvwriter3 = csv.writer(gw_picks)
-
-#get csv of top 10 manager information and write to top_managers.csv
-count = 0
-for manager in managerParsed:
-	if count == 0:
-		header = ['rank','entry','player_name','entry_name','total']
-		csvwriter1.writerow(header)
-		count += 1
-	
-	if count <= topManagerNumber:
-		csvwriter1.writerow([manager['rank'],manager['entry'],manager['player_name'],
-						manager['entry_name'],manager['total']])
-
-		count +=1
-		teamIDarray.append(manager['entry'])
-
-# for each teamID in the top 10, call the api and update both top_managers_gwInfo.csv and top_managers_gwPicks.csv
-count1 = 0
-count2 = 0
-for teamID in teamIDarray:
-	for x in gameWeeks:
-		url = "https://fantasy.premierleague.com/api/entry/"+str(teamID)+"/event/"+str(x)+"/picks/"
-		response = requests.get(url)
-		data = response.text
-		parsed = json.loads(data)
-
-		# write data to top_managers_gwInfo.csv
-		if count1 == 0:
-			header = ['team_id','gw','points','bench','gw_rank','transfers','hits','total_points',
-				'overall_ank','team_value','chip']
-
-			csvwriter2.writerow(header)
-			count1 += 1
-		try:
-			csvwriter2.writerow([teamID,x, parsed['entry_history']['points'], parsed['entry_history']['points_on_bench'],
-							parsed['entry_history']['rank'], parsed['entry_history']['event_transfers'],
-							parsed['entry_history']['event_transfers_cost'], parsed['entry_history']['total_points'],
-							parsed['entry_history']['overall_rank'], int(parsed['entry_history']['value'])/10, parsed['active_chip']])
-		except:
-			continue
-
-		# write data to top_managers_gwPicks.csv
-		for i in range(len(parsed['picks'])):
-			if count2 == 0:
-				header = ['team_id','gw','id','position','multiplier']
-				csvwriter3.writerow(header)
-				count2 += 1
-			csvwriter3.writerow([teamID, x, parsed['picks'][i]['element'], parsed['picks'][i]['position'], parsed['picks'][i]['multiplier']])
-
-manager_data.close()
-gw_data.close()
-gw_picks.close()
-
-# do some formatting on top_managers_gwPicks by adding the name of the player picked from player_idlist.csv
-df = pd.read_csv('data/2019-20/managers/top_managers_gwPicks.csv')
-df1 = pd.read_csv('data/2019-20/player_idlist.csv') 
-
-merged = df.merge(df1, on=['id'])
-merged.drop('first_name', axis=1, inplace=True)
-merged = merged[['team_id', 'gw', 'second_name', 'id', 'position', 'multiplier']]
-merged.rename({'id': 'player_id'}, axis=1, inplace=True)
-merged=merged.sort_values(by=['team_id', 'gw', 'position'])
-merged.to_csv('data/2019-20/managers/top_managers_gwPicks.csv',index=False)
+def write_top_managers(crawl_dir, managers_dir, season_dir):
+	""" Write top_managers.csv, top_managers_gwInfo.csv and top_managers_gwPicks.csv from a finished crawl
+	"""
+	standings = pd.DataFrame(read_table(crawl_dir, 'standings'))
+	standings.to_csv(os.path.join(managers_dir, 'top_managers.csv'), index=False, encoding="utf-8")
+	order = {entry: i for i, entry in enumerate(standings['entry'])}
+
+	# write data to top_managers_gwInfo.csv, managers in rank order
+	gw_info = pd.DataFrame(read_table(crawl_dir, 'gw_info'))
+	gw_info = gw_info.sort_values(by=['entry', 'gw'], key=lambda c: c.map(order) if c.name == 'entry' else c)
+	gw_info['value'] = gw_info['value'] / 10
+	gw_info = gw_info.rename({'entry': 'team_id', 'points_on_bench': 'bench', 'rank': 'gw_rank', 'event_transfers': 'transfers',
+		'event_transfers_cost': 'hits', 'overall_rank': 'overall_ank', 'value': 'team_value'}, axis=1)
+	gw_info.to_csv(os.path.join(managers_dir, 'top_managers_gwInfo.csv'), index=False, encoding="utf-8")
+
+	# do some formatting on top_managers_gwPicks by adding the name of the player picked from player_idlist.csv
+	df = pd.DataFrame(read_table(crawl_dir, 'picks'))[['entry', 'gw', 'element', 'position', 'multiplier']]
+	df = df.rename({'entry': 'team_id', 'element': 'id'}, axis=1)
+	df1 = pd.read_csv(os.path.join(season_dir, 'player_idlist.csv'))
+
+	merged = df.merge(df1, on=['id'])
+	merged.drop('first_name', axis=1, inplace=True)
+	merged = merged[['team_id', 'gw', 'second_name', 'id', 'position', 'multiplier']]
+	merged.rename({'id': 'player_id'}, axis=1, inplace=True)
+	merged=merged.sort_values(by=['team_id', 'gw', 'position'])
+	merged.to_csv(os.path.join(managers_dir, 'top_managers_gwPicks.csv'),index=False)
+
+def main():
+	parser = argparse.ArgumentParser(description='Standings and gameweek picks of the top managers of a league')
+	parser.add_argument('--season', default='2019-20')
+	parser.add_argument('--league', type=int, default=overallLeageID)
+	parser.add_argument('--managers', type=int, default=topManagerNumber)
+	parser.add_argument('--gws', type=int, nargs='+', default=gameWeeks)
+	parser.add_argument('--workers', type=int, default=WORKERS)
+	parser.add_argument('--rate', type=float, help='maximum requests per second')
+	parser.add_argument('--base-url', help='API root, e.g. a local mock API')
+	args = parser.parse_args()
+
+	season_dir = os.path.join('data', args.season)
+	managers_dir = os.path.join(season_dir, 'managers')
+	# the raw crawl, resumed by a rerun with the same arguments
+	crawl_dir = os.path.join(managers_dir, f'crawl_{args.league}_{args.managers}')
+
+	configure(base_url=args.base_url, rate=args.rate, pool_size=max(args.workers, POOL_SIZE), cache=False)
+	LeagueCrawler(args.league, args.gws, crawl_dir, args.managers, args.workers).crawl()
+	write_top_managers(crawl_dir, managers_dir, season_dir)
+
+if __name__ == '__main__':
+	main()